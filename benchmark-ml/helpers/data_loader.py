@@ -1,11 +1,15 @@
 from functools import partial
+from itertools import islice
 from typing import Tuple, Optional, Dict, Any
 
 import datasets
 from datasets import Dataset
+from datasets.distributed import split_dataset_by_node
 from transformers import AutoTokenizer, PreTrainedTokenizerBase
 
 from helpers.validation import validate_dataset
+from helpers.distributed import broadcast_object, gather_objects
+from helpers.synthetic import SyntheticTaskDataset
 from helpers.preprocessors import (
     preprocess_summarization,
     preprocess_classification,
@@ -13,15 +17,24 @@ from helpers.preprocessors import (
 )
 
 
+EVAL_SPLITS = ("validation", "test")
+
+
 def _stream_to_dataset(
     dataset_name: str,
     config_name: Optional[str],
     split: str,
-    samples: int
+    samples: int,
+    rank: int = 0,
+    world_size: int = 1
 ) -> Dataset:
     """
     STREAMING:
     ia maxim `samples` elemente din split și le pune într-un Dataset in-memory.
+    În mod distributed fiecare rank citește doar stream-ul lui (split_dataset_by_node:
+    fișiere diferite per rank dacă se împart exact, altfel 1 din world_size exemple)
+    și păstrează samples // world_size elemente, ca toate rank-urile să facă
+    același număr de step-uri.
     """
     stream = datasets.load_dataset(
         dataset_name,
@@ -30,15 +43,45 @@ def _stream_to_dataset(
         streaming=True
     )
 
-    collected = []
-    for i, item in enumerate(stream):
-        if i >= samples:
-            break
-        collected.append(item)
+    per_rank = _per_rank_samples(samples, world_size, split)
+    if world_size > 1:
+        stream = split_dataset_by_node(stream, rank=rank, world_size=world_size)
+
+    collected = list(islice(stream, per_rank))
+    if world_size > 1:
+        # split_dataset_by_node împarte round-robin -> pe un split scurt rank-urile
+        # pot primi numere diferite; decizia trebuie să fie aceeași pe toate rank-urile
+        counts = gather_objects(len(collected))
+        if min(counts) < per_rank:
+            raise ValueError(
+                f"Split '{split}' is too short for {world_size} x {per_rank} samples "
+                f"(per-rank counts: {counts}); unequal shards would desynchronize the ranks."
+            )
 
     return Dataset.from_list(collected)
 
 
+def _per_rank_samples(samples: int, world_size: int, split: str) -> int:
+    """
+    Nr. de exemple per rank (shard-uri egale, restul e ignorat).
+    """
+    per_rank = samples // world_size
+    if per_rank == 0:
+        raise ValueError(
+            f"Cannot shard {samples} '{split}' samples across {world_size} processes: "
+            f"each rank needs at least one sample."
+        )
+    return per_rank
+
+
+def _select_eval_split(dataset_name: str, config_name: Optional[str]) -> Optional[str]:
+    """
+    Primul split de eval existent ("validation", apoi "test") sau None.
+    """
+    available = datasets.get_dataset_split_names(dataset_name, config_name)
+    return next((split for split in EVAL_SPLITS if split in available), None)
+
+
 def build_tokenizer(model_name: str) -> PreTrainedTokenizerBase:
     """
     Load tokenizer + asigură-te că are pad_token.
@@ -49,20 +92,71 @@ def build_tokenizer(model_name: str) -> PreTrainedTokenizerBase:
     return tokenizer
 
 
+def _load_synthetic_datasets(
+    task: str,
+    dataset_cfg: Dict[str, Any],
+    tokenizer: PreTrainedTokenizerBase,
+    train_samples: int,
+    eval_samples: int,
+    rank: int = 0,
+    world_size: int = 1,
+) -> Tuple[SyntheticTaskDataset, Optional[SyntheticTaskDataset]]:
+    """
+    SYNTHETIC:
+    generează direct exemple tokenizate (lazy), fără download și fără tokenizare.
+    """
+    common = dict(
+        task=task,
+        synthetic_cfg=dataset_cfg.get("synthetic", {}),
+        max_input_len=dataset_cfg["max_input_len"],
+        max_target_len=dataset_cfg.get("max_target_len"),
+        vocab_size=len(tokenizer),
+        special_ids=tokenizer.all_special_ids,
+        num_shards=world_size,
+        shard_index=rank,
+    )
+
+    print(f"[data_loader] Generating synthetic train split ({train_samples} samples)...")
+    train_ds = SyntheticTaskDataset(num_samples=train_samples, split="train", **common)
+
+    eval_ds = None
+    if eval_samples > 0:
+        print(f"[data_loader] Generating synthetic eval split ({eval_samples} samples)...")
+        eval_ds = SyntheticTaskDataset(num_samples=eval_samples, split="validation", **common)
+
+    return train_ds, eval_ds
+
+
 def load_task_datasets(
     task: str,
     model_name: str,
     dataset_cfg: Dict[str, Any],
     train_samples: int,
     eval_samples: int,
+    rank: int = 0,
+    world_size: int = 1,
 ) -> Tuple[Dataset, Optional[Dataset], PreTrainedTokenizerBase]:
     """
     ENTRY POINT comun pentru toate task-urile:
     - validează datasetul (streaming, 1 sample)
     - încarcă train/eval cu streaming + sampling mic
     - aplică preprocessor în funcție de task
+    - pentru source == "synthetic" generează direct exemple tokenizate
+    - cu world_size > 1 fiecare rank primește doar shard-ul lui
     """
 
+    # Shard-uri goale -> eroare clară înainte de orice download
+    _per_rank_samples(train_samples, world_size, "train")
+    if eval_samples > 0:
+        _per_rank_samples(eval_samples, world_size, "eval")
+
+    if dataset_cfg.get("source") == "synthetic":
+        tokenizer = build_tokenizer(model_name)
+        train_ds, eval_ds = _load_synthetic_datasets(
+            task, dataset_cfg, tokenizer, train_samples, eval_samples, rank, world_size
+        )
+        return train_ds, eval_ds, tokenizer
+
     dataset_name = dataset_cfg["dataset_name"]
     config_name = dataset_cfg.get("config_name")
     input_column = dataset_cfg["input_column"]
@@ -79,18 +173,22 @@ def load_task_datasets(
     tokenizer = build_tokenizer(model_name)
 
     # streaming small slices
-    print(f"[data_loader] Streaming train split ({train_samples} samples)...")
-    train_ds = _stream_to_dataset(dataset_name, config_name, "train", train_samples)
+    print(f"[data_loader] Streaming train split ({train_samples} samples, shard {rank}/{world_size})...")
+    train_ds = _stream_to_dataset(dataset_name, config_name, "train", train_samples, rank, world_size)
 
+    # Split-ul de eval e ales pe rank 0 și trimis tuturor: `eval_ds is None`
+    # trebuie să fie la fel pe toate rank-urile (eval_strategy, gather în run_evaluation)
     eval_ds = None
-    for split in ("validation", "test"):
-        try:
-            print(f"[data_loader] Trying eval split '{split}'...")
-            eval_ds = _stream_to_dataset(dataset_name, config_name, split, eval_samples)
-            print(f"[data_loader] Using eval split '{split}'.")
-            break
-        except Exception:
-            continue
+    eval_split = None
+    if eval_samples > 0:
+        eval_split = broadcast_object(
+            _select_eval_split(dataset_name, config_name) if rank == 0 else None
+        )
+    if eval_split is not None:
+        print(f"[data_loader] Streaming eval split '{eval_split}' ({eval_samples} samples)...")
+        eval_ds = _stream_to_dataset(dataset_name, config_name, eval_split, eval_samples, rank, world_size)
+    elif eval_samples > 0:
+        print("[data_loader] No eval split found (validation / test), skipping evaluation.")
 
     # choose preprocess function
     if task == "summarization":
@@ -0,0 +1,231 @@
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+import torch
+import torch.distributed as dist
+from transformers import TrainerCallback, TrainingArguments, TrainerState, TrainerControl
+
+
+# Variabile setate de torchrun; le scoatem din env după init ca HF Trainer /
+# accelerate să ruleze single-process pe fiecare rank (gradientele sunt
+# sincronizate de GradientAllReduceCallback). Altfel Trainer-ul ar face DDP +
+# DistributedSampler peste shard-urile deja împărțite de load_task_datasets.
+# Depinde de detecția din env a accelerate/TrainingArguments (WORLD_SIZE /
+# LOCAL_RANK); tests/test_distributed.py verifică că args.world_size == 1.
+_TORCHRUN_ENV = ("RANK", "LOCAL_RANK", "WORLD_SIZE", "LOCAL_WORLD_SIZE", "GROUP_RANK")
+
+
+def init_distributed(backend: str = "gloo") -> Dict[str, int]:
+    """
+    Inițializează process group-ul dacă rulăm sub torchrun (WORLD_SIZE > 1).
+    Returnează {"rank", "world_size"}; fără torchrun -> rank 0 / world_size 1.
+    """
+    world_size = int(os.environ.get("WORLD_SIZE", 1))
+    rank = int(os.environ.get("RANK", 0))
+
+    if world_size > 1 and not dist.is_initialized():
+        dist.init_process_group(backend=backend, rank=rank, world_size=world_size)
+        for key in _TORCHRUN_ENV:
+            os.environ.pop(key, None)
+        print(f"[distributed] Rank {rank}/{world_size} initialized (backend={backend})")
+
+    return {"rank": get_rank(), "world_size": get_world_size()}
+
+
+def is_distributed() -> bool:
+    return dist.is_available() and dist.is_initialized()
+
+
+def get_rank() -> int:
+    return dist.get_rank() if is_distributed() else 0
+
+
+def get_world_size() -> int:
+    return dist.get_world_size() if is_distributed() else 1
+
+
+def is_main_process() -> bool:
+    return get_rank() == 0
+
+
+def cleanup_distributed() -> None:
+    if is_distributed():
+        dist.barrier()
+        dist.destroy_process_group()
+
+
+def broadcast_object(obj: Any) -> Any:
+    """
+    Trimite un obiect picklable de la rank 0 la toate rank-urile.
+    """
+    if not is_distributed():
+        return obj
+    payload = [obj]
+    dist.broadcast_object_list(payload, src=0)
+    return payload[0]
+
+
+def gather_objects(obj: Any) -> List[Any]:
+    """
+    all_gather pentru obiecte picklable (ex: statistici per rank).
+    """
+    if not is_distributed():
+        return [obj]
+    gathered = [None] * get_world_size()
+    dist.all_gather_object(gathered, obj)
+    return gathered
+
+
+def broadcast_trainable_parameters(model: torch.nn.Module) -> None:
+    """
+    Sincronizează parametrii antrenabili (ex: LoRA, inițializați random) de la rank 0.
+    """
+    if not is_distributed():
+        return
+    with torch.no_grad():
+        for param in model.parameters():
+            if param.requires_grad:
+                dist.broadcast(param.data, src=0)
+
+
+def all_reduce_mean(value: float, weight: float = 1.0) -> float:
+    """
+    Media ponderată a unui scalar peste toate rank-urile.
+    """
+    if not is_distributed():
+        return value
+    buf = torch.tensor([value * weight, weight], dtype=torch.float64)
+    dist.all_reduce(buf, op=dist.ReduceOp.SUM)
+    return (buf[0] / buf[1]).item() if buf[1] > 0 else value
+
+
+class GradientAllReduceCallback(TrainerCallback):
+    """
+    Data-parallel manual: înainte de fiecare optimizer step face media
+    gradientelor antrenabile peste rank-uri (un singur all_reduce pe un buffer
+    flatten) și aplică gradient clipping după sincronizare.
+
+    Măsoară per rank timpul de step și timpul de all-reduce.
+    """
+
+    def __init__(self, max_grad_norm: float = 1.0):
+        super().__init__()
+        self.max_grad_norm = max_grad_norm
+        self.step_times: List[float] = []
+        self.allreduce_times: List[float] = []
+        self._step_start: Optional[float] = None
+
+    def on_step_begin(self, args: TrainingArguments, state: TrainerState, control: TrainerControl, **kwargs):
+        self._step_start = time.perf_counter()
+
+    def on_pre_optimizer_step(self, args: TrainingArguments, state: TrainerState, control: TrainerControl, model=None, **kwargs):
+        params = [p for p in model.parameters() if p.requires_grad]
+        if not params:
+            return
+
+        start = time.perf_counter()
+        if is_distributed():
+            grads = [
+                p.grad if p.grad is not None else torch.zeros_like(p)
+                for p in params
+            ]
+            flat = torch.cat([g.detach().reshape(-1) for g in grads])
+            dist.all_reduce(flat, op=dist.ReduceOp.SUM)
+            flat /= get_world_size()
+
+            offset = 0
+            for p in params:
+                numel = p.numel()
+                p.grad = flat[offset:offset + numel].view_as(p).to(p.dtype)
+                offset += numel
+        self.allreduce_times.append(time.perf_counter() - start)
+
+        if self.max_grad_norm and self.max_grad_norm > 0:
+            torch.nn.utils.clip_grad_norm_(params, self.max_grad_norm)
+
+    def on_step_end(self, args: TrainingArguments, state: TrainerState, control: TrainerControl, **kwargs):
+        if self._step_start is not None:
+            self.step_times.append(time.perf_counter() - self._step_start)
+            self._step_start = None
+
+    def summary(self) -> Dict[str, Any]:
+        steps = len(self.step_times)
+        return {
+            "rank": get_rank(),
+            "steps": steps,
+            "mean_step_time_sec": sum(self.step_times) / steps if steps else None,
+            "mean_allreduce_time_sec": (
+                sum(self.allreduce_times) / len(self.allreduce_times) if self.allreduce_times else None
+            ),
+            "total_allreduce_time_sec": sum(self.allreduce_times),
+        }
+
+
+def scaling_report(
+    rank_stats: List[Dict[str, Any]],
+    training_time: float,
+    world_size: int,
+    scaling: str,
+    baseline_time: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Agregă statisticile per rank + eficiența de scalare față de un run single-process.
+
+    - strong (problemă globală fixă):   eff = T1 / (N * TN)
+    - weak   (problemă fixă per rank):  eff = T1 / TN
+    """
+    step_times = [s["mean_step_time_sec"] for s in rank_stats if s["mean_step_time_sec"] is not None]
+    allreduce_times = [s["mean_allreduce_time_sec"] for s in rank_stats if s["mean_allreduce_time_sec"] is not None]
+
+    report = {
+        "world_size": world_size,
+        "scaling": scaling,
+        "per_rank": rank_stats,
+        "mean_step_time_sec": sum(step_times) / len(step_times) if step_times else None,
+        "max_step_time_sec": max(step_times) if step_times else None,
+        "mean_allreduce_time_sec": sum(allreduce_times) / len(allreduce_times) if allreduce_times else None,
+        "baseline_training_time_sec": baseline_time,
+        "speedup": None,
+        "scaling_efficiency": None,
+    }
+
+    if baseline_time and training_time > 0:
+        if scaling == "weak":
+            report["scaling_efficiency"] = baseline_time / training_time
+            report["speedup"] = world_size * baseline_time / training_time
+        else:
+            report["speedup"] = baseline_time / training_time
+            report["scaling_efficiency"] = baseline_time / (world_size * training_time)
+
+    return report
+
+
+def load_baseline_training_time(baseline_run_dir: Optional[str]) -> Optional[float]:
+    """
+    Citește training_time_sec din ultimul record run_metrics.jsonl al unui run single-process.
+    """
+    if not baseline_run_dir:
+        return None
+    path = os.path.join(baseline_run_dir, "run_metrics.jsonl")
+    if not os.path.exists(path):
+        print(f"[distributed] Baseline run metrics not found: {path}")
+        return None
+
+    with open(path, "r") as f:
+        lines = [line for line in f if line.strip()]
+    if not lines:
+        return None
+    return json.loads(lines[-1]).get("training_time_sec")
+
+
+def broadcast_int(value: int) -> int:
+    """
+    Broadcast ieftin (tensor, fără pickle) al unui int de la rank 0 - ex: decizii per step.
+    """
+    if not is_distributed():
+        return value
+    buf = torch.tensor([value], dtype=torch.int64)
+    dist.broadcast(buf, src=0)
+    return int(buf.item())
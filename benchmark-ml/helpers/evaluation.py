@@ -0,0 +1,406 @@
+import math
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import psutil
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader
+from accelerate.utils import find_executable_batch_size
+from transformers import PreTrainedTokenizerBase
+
+
+# =========================
+# STREAMING STATISTICS
+# =========================
+
+class RunningMean:
+    """
+    Medie + varianță online (Welford) pentru intervalul de încredere 95%.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values: List[float]) -> None:
+        for value in values:
+            self.n += 1
+            delta = value - self.mean
+            self.mean += delta / self.n
+            self._m2 += delta * (value - self.mean)
+
+    def merge(self, other: "RunningMean") -> None:
+        """
+        Combină două acumulatoare (Chan et al.) - ex: statisticile altor rank-uri.
+        """
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self._m2 += other._m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+
+    def state(self) -> Tuple[int, float, float]:
+        return self.n, self.mean, self._m2
+
+    @classmethod
+    def from_state(cls, state: Tuple[int, float, float]) -> "RunningMean":
+        running = cls()
+        running.n, running.mean, running._m2 = state
+        return running
+
+    def ci_halfwidth(self) -> Optional[float]:
+        if self.n < 2:
+            return None
+        std = math.sqrt(self._m2 / (self.n - 1))
+        return 1.96 * std / math.sqrt(self.n)
+
+
+# =========================
+# ROUGE (pure python, fără dependențe extra)
+# =========================
+
+def _ngrams(tokens: List[str], n: int) -> Counter:
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+def _f1(overlap: int, pred_total: int, ref_total: int) -> float:
+    if overlap == 0 or pred_total == 0 or ref_total == 0:
+        return 0.0
+    precision = overlap / pred_total
+    recall = overlap / ref_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def _lcs_length(a: List[str], b: List[str]) -> int:
+    if not a or not b:
+        return 0
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        curr = [0]
+        for j, y in enumerate(b):
+            curr.append(prev[j] + 1 if x == y else max(prev[j + 1], curr[j]))
+        prev = curr
+    return prev[-1]
+
+
+def rouge_scores(prediction: str, reference: str) -> Dict[str, float]:
+    """
+    ROUGE-1 / ROUGE-2 / ROUGE-L (F1) pe cuvinte lowercase.
+    """
+    pred = prediction.lower().split()
+    ref = reference.lower().split()
+
+    scores = {}
+    for n in (1, 2):
+        pred_ngrams, ref_ngrams = _ngrams(pred, n), _ngrams(ref, n)
+        overlap = sum((pred_ngrams & ref_ngrams).values())
+        scores[f"rouge{n}"] = _f1(overlap, sum(pred_ngrams.values()), sum(ref_ngrams.values()))
+    scores["rougeL"] = _f1(_lcs_length(pred, ref), len(pred), len(ref))
+    return scores
+
+
+# =========================
+# PER-EXAMPLE LOSS
+# =========================
+
+def per_example_loss(task: str, logits: torch.Tensor, labels: torch.Tensor) -> torch.Tensor:
+    """
+    Cross-entropy per exemplu (media pe tokenii cu label != -100).
+    """
+    if task == "classification":
+        return F.cross_entropy(logits.float(), labels, reduction="none")
+
+    if task == "causal-lm":
+        logits = logits[:, :-1, :]
+        labels = labels[:, 1:]
+
+    token_loss = F.cross_entropy(
+        logits.float().reshape(-1, logits.size(-1)),
+        labels.reshape(-1),
+        ignore_index=-100,
+        reduction="none"
+    ).view(labels.shape)
+    mask = (labels != -100).float()
+    return (token_loss * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1.0)
+
+
+# =========================
+# METRIC ACCUMULATOR
+# =========================
+
+class _TaskMetrics:
+    """
+    Acumulează metricile task-ului batch cu batch. `primary` e metrica
+    per-exemplu folosită pentru intervalul de încredere.
+    """
+
+    def __init__(self, task: str):
+        self.task = task
+        self.loss = RunningMean()
+        self.primary = RunningMean()
+        # classification
+        self.confusion = Counter()
+        self.labels_seen = set()
+        # summarization
+        self.rouge_sums = Counter()
+        # causal-lm
+        self.nll_sum = 0.0
+        self.token_count = 0
+
+    def update_loss(self, losses: torch.Tensor) -> None:
+        self.loss.update(losses.tolist())
+        if self.task == "causal-lm":
+            self.primary.update(losses.tolist())
+
+    def update_classification(self, logits: torch.Tensor, labels: torch.Tensor) -> None:
+        preds = logits.argmax(dim=-1).tolist()
+        for pred, label in zip(preds, labels.tolist()):
+            self.labels_seen.update((pred, label))
+            if pred == label:
+                self.confusion[("tp", label)] += 1
+            else:
+                self.confusion[("fp", pred)] += 1
+                self.confusion[("fn", label)] += 1
+        self.primary.update([float(p == l) for p, l in zip(preds, labels.tolist())])
+
+    def update_causal_lm(self, losses: torch.Tensor, labels: torch.Tensor) -> None:
+        # perplexity ponderată pe tokeni: loss-ul per exemplu e media pe tokenii lui
+        token_counts = (labels[:, 1:] != -100).sum(dim=1)
+        self.nll_sum += (losses * token_counts).sum().item()
+        self.token_count += int(token_counts.sum().item())
+
+    def update_generation(self, predictions: List[str], references: List[str]) -> None:
+        rouge_l = []
+        for pred, ref in zip(predictions, references):
+            scores = rouge_scores(pred, ref)
+            self.rouge_sums.update(scores)
+            rouge_l.append(scores["rougeL"])
+        self.primary.update(rouge_l)
+
+    def state_dict(self) -> Dict[str, Any]:
+        """
+        Acumulatorii bruți (picklable) - se adună peste rank-uri înainte de compute().
+        """
+        return {
+            "loss": self.loss.state(),
+            "primary": self.primary.state(),
+            "confusion": dict(self.confusion),
+            "labels_seen": sorted(self.labels_seen),
+            "rouge_sums": dict(self.rouge_sums),
+            "nll_sum": self.nll_sum,
+            "token_count": self.token_count,
+        }
+
+    @classmethod
+    def from_state_dicts(cls, task: str, states: List[Dict[str, Any]]) -> "_TaskMetrics":
+        merged = cls(task)
+        for state in states:
+            merged.loss.merge(RunningMean.from_state(state["loss"]))
+            merged.primary.merge(RunningMean.from_state(state["primary"]))
+            merged.confusion.update(state["confusion"])
+            merged.labels_seen.update(state["labels_seen"])
+            merged.rouge_sums.update(state["rouge_sums"])
+            merged.nll_sum += state["nll_sum"]
+            merged.token_count += state["token_count"]
+        return merged
+
+    def compute(self) -> Dict[str, Any]:
+        metrics = {"eval_loss": self.loss.mean if self.loss.n else None}
+
+        if self.task == "classification" and self.primary.n:
+            metrics["eval_accuracy"] = self.primary.mean
+            f1_per_label = []
+            for label in sorted(self.labels_seen):
+                tp = self.confusion[("tp", label)]
+                denom = 2 * tp + self.confusion[("fp", label)] + self.confusion[("fn", label)]
+                f1_per_label.append(2 * tp / denom if denom else 0.0)
+            metrics["eval_f1_macro"] = sum(f1_per_label) / len(f1_per_label) if f1_per_label else 0.0
+        elif self.task == "summarization" and self.primary.n:
+            for key, total in self.rouge_sums.items():
+                metrics[f"eval_{key}"] = total / self.primary.n
+        elif self.task == "causal-lm" and self.token_count:
+            metrics["eval_perplexity"] = math.exp(min(self.nll_sum / self.token_count, 50.0))
+
+        return metrics
+
+
+# =========================
+# ENGINE
+# =========================
+
+@contextmanager
+def merged_adapter(model: torch.nn.Module):
+    """
+    LoRA merge-uit în weights pe durata blocului (unmerge la final).
+    """
+    merged = hasattr(model, "merge_adapter")
+    if merged:
+        model.merge_adapter()
+    try:
+        yield model
+    finally:
+        if merged:
+            model.unmerge_adapter()
+
+
+def estimate_cpu_batch_size(
+    model: torch.nn.Module,
+    task: str,
+    seq_len: int,
+    max_batch_size: int,
+    memory_fraction: float = 0.5,
+) -> int:
+    """
+    Batch size de start pe CPU, din memoria disponibilă: pe Linux un OOM pe CPU
+    omoară de obicei procesul în loc să arunce o excepție prinsă de
+    find_executable_batch_size.
+
+    Estimare per token (fp32): ~3 copii ale logits (logits, CE, softmax) +
+    ~16 activări de mărimea hidden_size.
+    """
+    config = getattr(model, "config", None)
+    hidden = (
+        getattr(config, "hidden_size", None)
+        or getattr(config, "d_model", None)
+        or getattr(config, "n_embd", None)
+        or 1024
+    )
+    if task == "classification":
+        out_dim = getattr(config, "num_labels", 2)
+    else:
+        out_dim = getattr(config, "vocab_size", None) or 50000
+
+    per_example = 4 * seq_len * (3 * out_dim + 16 * hidden)
+    available = psutil.virtual_memory().available * memory_fraction
+    return max(1, min(max_batch_size, int(available // per_example)))
+
+
+def run_evaluation(
+    model: torch.nn.Module,
+    task: str,
+    eval_ds,
+    data_collator: Callable,
+    tokenizer: PreTrainedTokenizerBase,
+    eval_cfg: Dict[str, Any],
+    gather_fn: Optional[Callable[[Any], List[Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluare finală: inference_mode + LoRA merge-uit + batch propriu (auto-sized).
+
+    eval_cfg:
+    - batch_size: int sau "auto" (pornește de la max_batch_size - pe CPU de la o
+      estimare din memoria disponibilă - și înjumătățește la OOM)
+    - max_batch_size: plafon pentru "auto"
+    - max_seq_len: lungimea logits-urilor, folosită la estimarea pe CPU
+    - time_budget_sec: oprește evaluarea când bugetul de timp s-a consumat
+    - ci_tolerance: oprește când semi-lățimea CI 95% a metricii principale
+      e sub ci_tolerance * |medie| (după cel puțin min_samples exemple)
+    - generation_max_new_tokens: lungimea maximă a rezumatelor generate
+    - merge_lora: False pentru modele deja merge-uite / cuantizate
+
+    gather_fn (ex: distributed.gather_objects) adună acumulatorii bruți de pe toate
+    rank-urile; metricile se calculează o singură dată, pe totalul lor.
+    """
+    device = next(model.parameters()).device
+
+    batch_size = eval_cfg.get("batch_size", "auto")
+    if batch_size != "auto":
+        start_batch_size = int(batch_size)
+    elif device.type == "cpu":
+        start_batch_size = estimate_cpu_batch_size(
+            model, task, int(eval_cfg.get("max_seq_len") or 512), int(eval_cfg.get("max_batch_size", 64))
+        )
+    else:
+        start_batch_size = int(eval_cfg.get("max_batch_size", 64))
+    time_budget = eval_cfg.get("time_budget_sec")
+    ci_tolerance = eval_cfg.get("ci_tolerance")
+    min_samples = int(eval_cfg.get("min_samples", 32))
+    max_new_tokens = int(eval_cfg.get("generation_max_new_tokens") or 128)
+    merge_lora = eval_cfg.get("merge_lora", True)
+
+    @find_executable_batch_size(starting_batch_size=start_batch_size)
+    def _evaluate(batch_size: int) -> Dict[str, Any]:
+        print(f"[eval] Running evaluation with batch size {batch_size}...")
+        loader = DataLoader(eval_ds, batch_size=batch_size, collate_fn=data_collator)
+        metrics = _TaskMetrics(task)
+        stop_reason = "completed"
+        start = time.perf_counter()
+
+        for batch in loader:
+            batch = {k: v.to(device) for k, v in batch.items()}
+            # Fără labels în forward: altfel modelul calculează încă o dată CE pe tot vocabularul
+            labels = batch.pop("labels")
+            if task == "summarization" and "decoder_input_ids" not in batch:
+                batch["decoder_input_ids"] = model.prepare_decoder_input_ids_from_labels(labels=labels)
+            outputs = model(**batch)
+
+            losses = per_example_loss(task, outputs.logits, labels)
+            metrics.update_loss(losses)
+            if task == "classification":
+                metrics.update_classification(outputs.logits, labels)
+            elif task == "causal-lm":
+                metrics.update_causal_lm(losses, labels)
+            elif task == "summarization":
+                generated = model.generate(
+                    input_ids=batch["input_ids"],
+                    attention_mask=batch.get("attention_mask"),
+                    max_new_tokens=max_new_tokens,
+                    num_beams=1,
+                    do_sample=False,
+                )
+                references = labels.masked_fill(labels == -100, tokenizer.pad_token_id)
+                metrics.update_generation(
+                    tokenizer.batch_decode(generated, skip_special_tokens=True),
+                    tokenizer.batch_decode(references, skip_special_tokens=True),
+                )
+
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                stop_reason = "time_budget"
+                break
+
+            halfwidth = metrics.primary.ci_halfwidth()
+            if (
+                ci_tolerance is not None
+                and halfwidth is not None
+                and metrics.primary.n >= min_samples
+                and halfwidth <= ci_tolerance * max(abs(metrics.primary.mean), 1e-8)
+            ):
+                stop_reason = "ci_converged"
+                break
+
+        return {
+            "metrics": metrics.state_dict(),
+            "samples": metrics.loss.n,
+            "runtime": time.perf_counter() - start,
+            "batch_size": batch_size,
+            "stop_reason": stop_reason,
+        }
+
+    was_training = model.training
+    model.eval()
+    try:
+        with merged_adapter(model) if merge_lora else nullcontext(), torch.inference_mode():
+            local = _evaluate()
+    finally:
+        model.train(was_training)
+
+    ranks = gather_fn(local) if gather_fn else [local]
+    merged = _TaskMetrics.from_state_dicts(task, [r["metrics"] for r in ranks])
+    stop_reasons = sorted({r["stop_reason"] for r in ranks})
+
+    result = merged.compute()
+    result.update({
+        "eval_samples": merged.loss.n,
+        "eval_runtime": max(r["runtime"] for r in ranks),
+        "eval_samples_per_second": sum(r["samples"] / r["runtime"] for r in ranks if r["runtime"] > 0) or None,
+        "eval_batch_size": local["batch_size"],
+        "eval_ci_halfwidth": merged.primary.ci_halfwidth(),
+        "eval_stop_reason": stop_reasons[0] if len(stop_reasons) == 1 else ",".join(stop_reasons),
+    })
+    return result
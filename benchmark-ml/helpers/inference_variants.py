@@ -0,0 +1,234 @@
+import copy
+import io
+import time
+from typing import Dict, Any, Iterator, List, Callable, Tuple
+
+import torch
+from torch import nn
+from torch.utils.data import DataLoader, Subset
+from transformers import PreTrainedTokenizerBase
+from transformers.pytorch_utils import Conv1D
+
+from helpers.evaluation import run_evaluation
+
+
+# baseline = modelul PEFT antrenat (fp32, LoRA ne-merge-uit) -> referință pentru drift
+VARIANTS = ("baseline", "merged", "int8", "merged_int8")
+
+QUALITY_METRICS = (
+    "eval_loss",
+    "eval_accuracy",
+    "eval_f1_macro",
+    "eval_rouge1",
+    "eval_rouge2",
+    "eval_rougeL",
+    "eval_perplexity",
+)
+
+
+def conv1d_to_linear(model: nn.Module) -> int:
+    """
+    Înlocuiește in-place transformers Conv1D (GPT-2: c_attn / c_proj / c_fc) cu
+    nn.Linear echivalent (weight transpus), ca să poată fi cuantizat dinamic.
+    Returnează numărul de module convertite.
+    """
+    converted = 0
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if not isinstance(child, Conv1D):
+                continue
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features, bias=child.bias is not None)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                if child.bias is not None:
+                    linear.bias.copy_(child.bias)
+            setattr(parent, name, linear)
+            converted += 1
+    return converted
+
+
+def quantize_linear_int8(model: nn.Module) -> Tuple[nn.Module, Dict[str, Any]]:
+    """
+    Dynamic int8 quantization (torch.ao) pentru nn.Linear (+ Conv1D convertit), in-place.
+    Straturile LoRA (lora_A / lora_B) rămân fp32, altfel forward-ul PEFT nu mai merge.
+    Returnează modelul și ce module au fost cuantizate.
+    """
+    converted = conv1d_to_linear(model)
+    linear_names = sorted(
+        name for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and "lora_" not in name
+    )
+    model = torch.ao.quantization.quantize_dynamic(
+        model, qconfig_spec=set(linear_names), dtype=torch.qint8, inplace=True
+    )
+    return model, {
+        "quantized_modules": len(linear_names),
+        "converted_conv1d": converted,
+        "quantized_module_names": linear_names,
+    }
+
+
+def build_variant(model: nn.Module, variant: str) -> Tuple[nn.Module, Dict[str, Any]]:
+    """
+    Copie CPU/fp32 a modelului antrenat, transformată conform variantei.
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown inference variant '{variant}'. Available: {list(VARIANTS)}")
+
+    model_copy = copy.deepcopy(model).to(device="cpu", dtype=torch.float32)
+    info = {"quantized_modules": 0, "converted_conv1d": 0, "quantized_module_names": []}
+    if variant in ("merged", "merged_int8"):
+        model_copy = model_copy.merge_and_unload()
+    if variant in ("int8", "merged_int8"):
+        model_copy, info = quantize_linear_int8(model_copy)
+    return model_copy.eval(), info
+
+
+def model_size_mb(model: nn.Module) -> float:
+    """
+    Dimensiunea state_dict-ului serializat cu torch.save (= dimensiunea pe disc).
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 ** 2)
+
+
+def _cycle(loader: DataLoader) -> Iterator[Dict[str, Any]]:
+    # Reia loader-ul cât e nevoie, ca să se atingă warmup_batches + num_batches
+    while True:
+        empty = True
+        for batch in loader:
+            empty = False
+            yield batch
+        if empty:
+            return
+
+
+def benchmark_latency(
+    model: nn.Module,
+    loader: DataLoader,
+    num_batches: int,
+    warmup_batches: int,
+    task: str,
+    generation_max_new_tokens: int = 128,
+) -> Dict[str, Any]:
+    """
+    Latență per batch + throughput, sub inference_mode, pe calea folosită în deployment:
+    forward fără labels (classification / causal-lm) și generate() pentru summarization.
+    Tokenii numărați sunt cei de input la forward și cei generați la generate().
+    """
+    latencies: List[float] = []
+    samples = 0
+    tokens = 0
+
+    with torch.inference_mode():
+        for i, batch in enumerate(_cycle(loader)):
+            if i >= warmup_batches + num_batches:
+                break
+            inputs = {k: v for k, v in batch.items() if k in ("input_ids", "attention_mask")}
+
+            start = time.perf_counter()
+            if task == "summarization":
+                generated = model.generate(
+                    **inputs, max_new_tokens=generation_max_new_tokens, num_beams=1, do_sample=False
+                )
+            else:
+                model(**inputs)
+            elapsed = time.perf_counter() - start
+
+            if i < warmup_batches:
+                continue
+            latencies.append(elapsed)
+            samples += inputs["input_ids"].size(0)
+            if task == "summarization":
+                tokens += generated.numel()
+            elif "attention_mask" in inputs:
+                tokens += int(inputs["attention_mask"].sum().item())
+            else:
+                tokens += inputs["input_ids"].numel()
+
+    mode = "generate" if task == "summarization" else "forward"
+    if not latencies:
+        return {"latency_mode": mode, "timed_batches": 0,
+                "latency_ms_mean": None, "latency_ms_p50": None, "latency_ms_p95": None,
+                "throughput_samples_per_sec": None, "throughput_tokens_per_sec": None}
+
+    ordered = sorted(latencies)
+    total = sum(latencies)
+    return {
+        "latency_mode": mode,
+        "timed_batches": len(latencies),
+        "latency_ms_mean": 1000 * total / len(latencies),
+        "latency_ms_p50": 1000 * ordered[len(ordered) // 2],
+        "latency_ms_p95": 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "throughput_samples_per_sec": samples / total,
+        "throughput_tokens_per_sec": tokens / total,
+    }
+
+
+def run_inference_variants(
+    model: nn.Module,
+    task: str,
+    eval_ds,
+    data_collator: Callable,
+    tokenizer: PreTrainedTokenizerBase,
+    variants_cfg: Dict[str, Any],
+    generation_max_new_tokens: int = 128,
+) -> Dict[str, Any]:
+    """
+    Benchmark CPU pentru variantele de deployment ale modelului antrenat:
+    latență, throughput, dimensiune pe disc și drift de calitate față de baseline.
+
+    variants_cfg:
+    - variants: subset din VARIANTS ("baseline" e mereu inclus, e referința)
+    - batch_size, num_batches, warmup_batches: pentru latență (subset-ul e reluat
+      ciclic până se ating warmup_batches + num_batches batch-uri)
+    - eval_samples: câte exemple eval se folosesc pentru drift (aceleași pentru toate variantele)
+    """
+    variants = ["baseline"] + [v for v in variants_cfg.get("variants", VARIANTS) if v != "baseline"]
+    batch_size = int(variants_cfg.get("batch_size", 8))
+    num_batches = int(variants_cfg.get("num_batches", 20))
+    warmup_batches = int(variants_cfg.get("warmup_batches", 2))
+    eval_samples = min(int(variants_cfg.get("eval_samples", 64)), len(eval_ds))
+
+    subset = Subset(eval_ds, range(eval_samples))
+    loader = DataLoader(subset, batch_size=batch_size, collate_fn=data_collator)
+    eval_cfg = {
+        "batch_size": batch_size,
+        "merge_lora": False,
+        "generation_max_new_tokens": generation_max_new_tokens,
+    }
+
+    results = {}
+    for variant in variants:
+        print(f"[variants] Benchmarking '{variant}' on CPU...")
+        variant_model, quant_info = build_variant(model, variant)
+
+        record = {"model_size_MB": round(model_size_mb(variant_model), 2), **quant_info}
+        record.update(benchmark_latency(
+            variant_model, loader, num_batches, warmup_batches, task, generation_max_new_tokens
+        ))
+        metrics = run_evaluation(variant_model, task, subset, data_collator, tokenizer, eval_cfg)
+        record["metrics"] = {k: metrics[k] for k in QUALITY_METRICS if metrics.get(k) is not None}
+
+        results[variant] = record
+        del variant_model
+
+    # Drift față de modelul ne-cuantizat (baseline)
+    baseline = results["baseline"]
+    for variant, record in results.items():
+        record["drift"] = {
+            key: record["metrics"][key] - baseline["metrics"][key]
+            for key in record["metrics"] if key in baseline["metrics"]
+        }
+        if baseline["latency_ms_mean"] and record["latency_ms_mean"]:
+            record["speedup_vs_baseline"] = baseline["latency_ms_mean"] / record["latency_ms_mean"]
+        record["size_ratio_vs_baseline"] = record["model_size_MB"] / baseline["model_size_MB"]
+
+    return {
+        "device": "cpu",
+        "batch_size": batch_size,
+        "eval_samples": eval_samples,
+        "variants": results,
+    }
@@ -1,6 +1,12 @@
+import statistics
+import time
+from collections import deque
+from typing import Dict, Any, Deque, Optional, Tuple
+
 from transformers import TrainerCallback, TrainingArguments, TrainerState, TrainerControl
 
 from helpers.utils import monitor_step
+from helpers.distributed import broadcast_int
 
 
 class CustomMonitorCallback(TrainerCallback):
@@ -33,3 +39,101 @@ class CustomMonitorCallback(TrainerCallback):
             learning_rate=lr,
             output_dir=self.output_dir
         )
+
+
+class BenchmarkStopCallback(TrainerCallback):
+    """
+    Benchmark mode: oprește training-ul la primul dintre
+    - time_budget_sec: buget wall-clock consumat
+    - token_budget: tokeni de input procesați (toate rank-urile)
+    - converged: coeficientul de variație al ultimelor `window_steps` step-uri
+      (după `warmup_steps`) scade sub `step_time_cv_threshold`
+
+    Throughput-ul steady-state se calculează pe aceeași fereastră.
+    În mod distributed decizia e luată pe rank 0 și trimisă tuturor rank-urilor.
+    """
+
+    STOP_REASONS = ("completed", "time_budget", "token_budget", "converged")
+
+    def __init__(self, benchmark_cfg: Dict[str, Any], samples_per_step: int, world_size: int = 1):
+        super().__init__()
+        self.time_budget = benchmark_cfg.get("time_budget_sec")
+        self.token_budget = benchmark_cfg.get("token_budget")
+        self.cv_threshold = benchmark_cfg.get("step_time_cv_threshold")
+        self.window_steps = max(2, int(benchmark_cfg.get("window_steps", 20)))
+        self.warmup_steps = int(benchmark_cfg.get("warmup_steps", 5))
+        self.samples_per_step = samples_per_step
+        self.world_size = world_size
+
+        self.stop_reason = "completed"
+        self.steps = 0
+        self.tokens_seen = 0
+        self.elapsed = 0.0
+        self._train_start: Optional[float] = None
+        self._step_start: Optional[float] = None
+        self._last_tokens = 0
+        self._window: Deque[Tuple[float, int]] = deque(maxlen=self.window_steps)
+
+    def on_train_begin(self, args: TrainingArguments, state: TrainerState, control: TrainerControl, **kwargs):
+        self._train_start = time.perf_counter()
+
+    def on_step_begin(self, args: TrainingArguments, state: TrainerState, control: TrainerControl, **kwargs):
+        self._step_start = time.perf_counter()
+
+    def _step_time_cv(self) -> Optional[float]:
+        if len(self._window) < self.window_steps:
+            return None
+        times = [t for t, _ in self._window]
+        mean = sum(times) / len(times)
+        std = statistics.stdev(times)
+        return std / mean if mean > 0 else None
+
+    def _check_stop(self) -> str:
+        if self.time_budget is not None and self.elapsed >= self.time_budget:
+            return "time_budget"
+        if self.token_budget is not None and self.tokens_seen >= self.token_budget:
+            return "token_budget"
+        cv = self._step_time_cv()
+        if self.cv_threshold is not None and cv is not None and cv <= self.cv_threshold:
+            return "converged"
+        return "completed"
+
+    def on_step_end(self, args: TrainingArguments, state: TrainerState, control: TrainerControl, **kwargs):
+        now = time.perf_counter()
+        self.steps += 1
+        self.elapsed = now - self._train_start
+
+        # num_input_tokens_seen e per rank (Trainer-ul rulează single-process pe fiecare rank)
+        step_tokens = (state.num_input_tokens_seen - self._last_tokens) * self.world_size
+        self._last_tokens = state.num_input_tokens_seen
+        self.tokens_seen += step_tokens
+
+        if self._step_start is not None and self.steps > self.warmup_steps:
+            self._window.append((now - self._step_start, step_tokens))
+        self._step_start = None
+
+        reason = self.STOP_REASONS[broadcast_int(self.STOP_REASONS.index(self._check_stop()))]
+        if reason != "completed":
+            self.stop_reason = reason
+            control.should_training_stop = True
+            print(f"[benchmark] Stopping at step {state.global_step}: {reason}")
+
+    def summary(self) -> Dict[str, Any]:
+        step_time = tokens_per_sec = samples_per_sec = None
+        if self._window:
+            total_time = sum(t for t, _ in self._window)
+            step_time = total_time / len(self._window)
+            tokens_per_sec = sum(n for _, n in self._window) / total_time
+            samples_per_sec = self.samples_per_step / step_time
+
+        return {
+            "stop_reason": self.stop_reason,
+            "steps": self.steps,
+            "elapsed_sec": self.elapsed,
+            "tokens_seen": self.tokens_seen,
+            "step_time_cv": self._step_time_cv(),
+            "steady_state_window_steps": len(self._window),
+            "steady_state_step_time_sec": step_time,
+            "steady_state_samples_per_sec": samples_per_sec,
+            "steady_state_tokens_per_sec": tokens_per_sec,
+        }
@@ -0,0 +1,157 @@
+import math
+import random
+from typing import Dict, Any, Iterable, List, Optional
+
+from torch.utils.data import Dataset as TorchDataset
+
+
+# =========================
+# LENGTH DISTRIBUTIONS
+# =========================
+
+LENGTH_DISTRIBUTIONS = ("fixed", "uniform", "lognormal", "bimodal")
+
+# Parametrii exprimați în tokeni; cu "relative": true sunt fracțiuni din max_len
+_LENGTH_KEYS = ("length", "min", "max", "median", "short", "long", "std")
+
+
+def sample_length(rng: random.Random, dist_cfg: Dict[str, Any], max_len: int) -> int:
+    """
+    Sample o lungime de secvență din distribuția configurată, clamp-uită în [1, max_len].
+
+    - fixed:     {"type": "fixed", "length": 128}
+    - uniform:   {"type": "uniform", "min": 16, "max": 512}
+    - lognormal: {"type": "lognormal", "median": 128, "sigma": 0.5}
+    - bimodal:   {"type": "bimodal", "short": 64, "long": 448, "std": 16, "p_long": 0.3}
+
+    Cu "relative": true lungimile sunt fracțiuni din max_len (ex: "median": 0.5),
+    astfel încât distribuția scalează cu sequence_length.
+    """
+    if dist_cfg.get("relative"):
+        dist_cfg = {
+            k: (float(v) * max_len if k in _LENGTH_KEYS else v)
+            for k, v in dist_cfg.items()
+        }
+    kind = dist_cfg.get("type", "fixed")
+
+    if kind == "fixed":
+        length = dist_cfg.get("length", max_len)
+    elif kind == "uniform":
+        length = rng.randint(int(round(dist_cfg.get("min", 1))), int(round(dist_cfg.get("max", max_len))))
+    elif kind == "lognormal":
+        median = float(dist_cfg.get("median", max_len / 4))
+        length = rng.lognormvariate(math.log(median), float(dist_cfg.get("sigma", 0.5)))
+    elif kind == "bimodal":
+        mode = dist_cfg.get("long", max_len) if rng.random() < float(dist_cfg.get("p_long", 0.5)) \
+            else dist_cfg.get("short", max(1, max_len // 8))
+        length = rng.gauss(float(mode), float(dist_cfg.get("std", 0.0)))
+    else:
+        raise ValueError(
+            f"Unknown length distribution '{kind}'. Available: {list(LENGTH_DISTRIBUTIONS)}"
+        )
+
+    return max(1, min(int(round(length)), max_len))
+
+
+# =========================
+# DATASET
+# =========================
+
+class SyntheticTaskDataset(TorchDataset):
+    """
+    Dataset sintetic deja tokenizat (fără tokenizer la generare).
+
+    Exemplele se generează lazy în __getitem__, cu un RNG derivat din
+    (seed, split, idx): același seed dă aceleași exemple, indiferent de ordinea
+    de acces sau de numărul de samples.
+    """
+
+    def __init__(
+        self,
+        task: str,
+        num_samples: int,
+        synthetic_cfg: Dict[str, Any],
+        max_input_len: int,
+        max_target_len: Optional[int] = None,
+        vocab_size: Optional[int] = None,
+        special_ids: Iterable[int] = (),
+        split: str = "train",
+        num_shards: int = 1,
+        shard_index: int = 0,
+    ):
+        if task not in ("summarization", "classification", "causal-lm"):
+            raise ValueError(f"Unknown task '{task}'")
+
+        self.task = task
+        self.split = split
+        # Sharding (distributed): rank-ul `shard_index` vede indicii globali
+        # shard_index, shard_index + num_shards, ... (shard-uri egale, restul e ignorat)
+        self.num_shards = num_shards
+        self.shard_index = shard_index
+        self.num_samples = num_samples // num_shards
+        self.seed = int(synthetic_cfg.get("seed", 42))
+        self.max_input_len = max_input_len
+        self.max_target_len = max_target_len or max_input_len
+
+        self.input_length_cfg = synthetic_cfg.get("input_length", {"type": "fixed"})
+        self.target_length_cfg = synthetic_cfg.get("target_length", {"type": "fixed"})
+        self.num_labels = int(synthetic_cfg.get("num_labels", 2))
+
+        # Vocabular: [vocab_offset, vocab_size) fără tokenii speciali ai tokenizer-ului
+        # (ex: [UNK]/[CLS]/[SEP]/[MASK] = 100-103 la BERT, EOS = pad la GPT-2)
+        self.vocab_offset = int(synthetic_cfg.get("vocab_offset", 100))
+        cfg_vocab = synthetic_cfg.get("vocab_size")
+        if cfg_vocab is None:
+            cfg_vocab = vocab_size
+        elif vocab_size is not None:
+            cfg_vocab = min(int(cfg_vocab), vocab_size)
+        if cfg_vocab is None or int(cfg_vocab) <= self.vocab_offset:
+            raise ValueError(
+                f"Synthetic vocab_size ({cfg_vocab}) must be larger than vocab_offset ({self.vocab_offset})"
+            )
+        excluded = set(special_ids)
+        self.vocab = [i for i in range(self.vocab_offset, int(cfg_vocab)) if i not in excluded]
+        if not self.vocab:
+            raise ValueError("Synthetic vocabulary is empty after excluding special tokens")
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def _rng(self, idx: int) -> random.Random:
+        # seed-ul string e determinist (nu depinde de PYTHONHASHSEED)
+        return random.Random(f"{self.seed}:{self.split}:{idx}")
+
+    def _tokens(self, rng: random.Random, length: int) -> List[int]:
+        return rng.choices(self.vocab, k=length)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        if idx < 0:
+            idx += self.num_samples
+        if not 0 <= idx < self.num_samples:
+            raise IndexError(f"Index {idx} out of range for {self.num_samples} samples")
+
+        rng = self._rng(self.shard_index + idx * self.num_shards)
+        input_len = sample_length(rng, self.input_length_cfg, self.max_input_len)
+        input_ids = self._tokens(rng, input_len)
+        example = {
+            "input_ids": input_ids,
+            "attention_mask": [1] * input_len,
+        }
+
+        if self.task == "summarization":
+            target_len = sample_length(rng, self.target_length_cfg, self.max_target_len)
+            example["labels"] = self._tokens(rng, target_len)
+        elif self.task == "classification":
+            example["labels"] = rng.randrange(self.num_labels)
+        # causal-lm: labels sunt construite de DataCollatorForLanguageModeling
+
+        return example
+
+
+def train_sampling_strategy(dataset) -> str:
+    """
+    Sampler-ul de train pentru HF Trainer: "sequential" pentru SyntheticTaskDataset
+    (exemplele sunt deja i.i.d. per index, iar RandomSampler ar face
+    torch.randperm(len) la fiecare epocă -> memorie O(num_samples)), "random" în rest.
+    """
+    return "sequential" if isinstance(dataset, SyntheticTaskDataset) else "random"
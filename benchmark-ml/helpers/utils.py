@@ -17,10 +17,12 @@ def monitor_run(
     train_loss: float,
     eval_loss: Optional[float],
     training_time: float,
-    output_dir: str
+    output_dir: str,
+    extra_metrics: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Log final metrics pentru un run (după train + eval).
+    `extra_metrics` (ex: statistici distributed) sunt adăugate în același record.
     """
     process = psutil.Process(os.getpid())
     cpu_usage = process.cpu_percent()
@@ -39,6 +41,8 @@ def monitor_run(
         "gpu_mem_GB": round(gpu_mem, 2),
         "disk_used_GB": round(disk_used, 3)
     }
+    if extra_metrics:
+        record.update(extra_metrics)
 
     _ensure_dir(output_dir)
     path = os.path.join(output_dir, "run_metrics.jsonl")
@@ -7,25 +7,42 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from runner.run_benchmark import run_pipeline
+from helpers.distributed import init_distributed, cleanup_distributed, is_main_process
 
 def load_config(config_path):
     with open(config_path, 'r') as f:
         return json.load(f)
 
+def launch_local_processes(nproc):
+    # Re-launch this script under torchrun (single node, local CPU processes).
+    # Workers see WORLD_SIZE in env, so they ignore --nproc-per-node.
+    from torch.distributed.run import main as torchrun_main
+    torchrun_main(["--standalone", f"--nproc-per-node={nproc}", os.path.abspath(__file__), *sys.argv[1:]])
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="NeuroCore Benchmark Runner")
     parser.add_argument("--config", type=str, help="Path to the JSON configuration file")
+    parser.add_argument("--nproc-per-node", type=int, default=None,
+                        help="Launch N local data-parallel processes (torchrun, gloo backend)")
     
     args = parser.parse_args()
 
+    if args.nproc_per_node and "WORLD_SIZE" not in os.environ:
+        launch_local_processes(args.nproc_per_node)
+        sys.exit(0)
+
     if args.config:
         # Production Mode: Run with config from API
-        print(f"[Main] Loading config from: {args.config}")
         user_cfg = load_config(args.config)
-        print(f"[Main] Configuration loaded: {user_cfg.get('task')} / {user_cfg.get('model')}")
+        init_distributed(user_cfg.get("distributed", {}).get("backend", "gloo"))
+        if is_main_process():
+            print(f"[Main] Loading config from: {args.config}")
+            print(f"[Main] Configuration loaded: {user_cfg.get('task')} / {user_cfg.get('model')}")
         
         result = run_pipeline(user_cfg)
-        print(json.dumps(result, indent=2))
+        if is_main_process():
+            print(json.dumps(result, indent=2))
+        cleanup_distributed()
         
     else:
         # Fallback / Dev Mode
@@ -36,4 +53,6 @@ if __name__ == "__main__":
             "attention": "flash",
             "steps": 10
         }
-        run_pipeline(user_cfg)
\ No newline at end of file
+        init_distributed()
+        run_pipeline(user_cfg)
+        cleanup_distributed()
@@ -10,6 +10,13 @@ def load_json(path: str) -> Dict[str, Any]:
     with open(path, "r") as f:
         return json.load(f)
 
+def _apply_block_override(block: Dict[str, Any], override: Any) -> None:
+    # UI can send either a bool (enable/disable) or a dict of overrides
+    if isinstance(override, dict):
+        block.update(override)
+    else:
+        block["enabled"] = bool(override)
+
 def merge_user_config(user_cfg: Dict[str, Any]) -> Dict[str, Any]:
     # 1. Load Defaults
     raw_task = user_cfg.get("task", "summarization")
@@ -45,6 +52,12 @@ def merge_user_config(user_cfg: Dict[str, Any]) -> Dict[str, Any]:
         if backend_task == "summarization": 
             datasets_cfg[backend_task]["max_target_len"] = min(seq_len, 128)
 
+    # Dataset Source (hub / synthetic)
+    if "dataset_source" in user_cfg:
+        datasets_cfg[backend_task]["source"] = user_cfg["dataset_source"]
+    if "synthetic" in user_cfg:
+        datasets_cfg[backend_task].setdefault("synthetic", {}).update(user_cfg["synthetic"])
+
     # Batch Size
     if "batch_size" in user_cfg:
         training_cfg["per_device_train_batch_size"] = int(user_cfg["batch_size"])
@@ -56,6 +69,24 @@ def merge_user_config(user_cfg: Dict[str, Any]) -> Dict[str, Any]:
         training_cfg["eval_steps"] = steps
         training_cfg["save_steps"] = steps * 10 
 
+    # Final Evaluation Overrides
+    EVAL_OVERRIDES = {
+        "eval_batch_size": "batch_size",
+        "eval_time_budget_sec": "time_budget_sec",
+        "eval_ci_tolerance": "ci_tolerance",
+    }
+    for ui_key, eval_key in EVAL_OVERRIDES.items():
+        if ui_key in user_cfg:
+            training_cfg["evaluation"][eval_key] = user_cfg[ui_key]
+
+    # Deployment Variants (LoRA merge / int8)
+    if "inference_variants" in user_cfg:
+        _apply_block_override(training_cfg["inference_variants"], user_cfg["inference_variants"])
+
+    # Benchmark Mode (time / token budget, step-time convergence)
+    if "benchmark_mode" in user_cfg:
+        _apply_block_override(training_cfg["benchmark_mode"], user_cfg["benchmark_mode"])
+
     # Learning Rate Override ---
     if "learning_rate" in user_cfg:
         training_cfg["learning_rate"] = float(user_cfg["learning_rate"])
@@ -73,6 +104,12 @@ def merge_user_config(user_cfg: Dict[str, Any]) -> Dict[str, Any]:
         },
         "training": training_cfg,
         "general": general_cfg,
+        "distributed": {
+            "backend": "gloo",
+            "scaling": "strong",
+            "baseline_run_dir": None,
+            **user_cfg.get("distributed", {})
+        },
         "train_samples": int(user_cfg.get("train_samples", 512)),
         "eval_samples": int(user_cfg.get("eval_samples", 128))
     }
\ No newline at end of file
@@ -14,5 +14,8 @@ def run_pipeline(user_cfg):
         "eval_metrics": result["eval_metrics"],
         "monitor_record": result["monitor_record"],
         "output_dir": result["output_dir"],
-        "lora_info": result.get("lora_info")
+        "lora_info": result.get("lora_info"),
+        "distributed": result.get("distributed"),
+        "inference_variants": result.get("inference_variants"),
+        "benchmark": result.get("benchmark")
     }
@@ -19,9 +19,24 @@ from peft import LoraConfig, get_peft_model, TaskType
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from helpers.data_loader import load_task_datasets
+from helpers.synthetic import train_sampling_strategy
 from helpers.attention_switcher import apply_attention_implementation
-from helpers.step_callback import CustomMonitorCallback
+from helpers.step_callback import CustomMonitorCallback, BenchmarkStopCallback
 from helpers.utils import monitor_run
+from helpers.evaluation import run_evaluation
+from helpers.inference_variants import run_inference_variants
+from helpers.distributed import (
+    get_rank,
+    get_world_size,
+    is_main_process,
+    broadcast_object,
+    gather_objects,
+    broadcast_trainable_parameters,
+    all_reduce_mean,
+    GradientAllReduceCallback,
+    scaling_report,
+    load_baseline_training_time,
+)
 
 def get_model_class(task):
     if task == "summarization":
@@ -43,16 +58,28 @@ def run_training(final_cfg):
     
     model_name = final_cfg["model_name"]
     task = final_cfg["task"]
-    
-    # Ensure output directory exists
-    run_id = f"run_{int(time.time())}"
+
+    # Distributed (torchrun + gloo): process group-ul e inițializat în main.py
+    dist_cfg = final_cfg.get("distributed", {})
+    rank = get_rank()
+    world_size = get_world_size()
+    main_process = is_main_process()
+
+    # Ensure output directory exists (same run_id on every rank)
+    run_id = broadcast_object(f"run_{int(time.time())}")
     output_dir = os.path.join(general_cfg["base_output_dir"], run_id)
-    os.makedirs(output_dir, exist_ok=True)
-    
+
     # Dump config
-    import json
-    with open(os.path.join(output_dir, "config.json"), "w") as f:
-        json.dump(final_cfg, f, indent=2)
+    if main_process:
+        os.makedirs(output_dir, exist_ok=True)
+        import json
+        with open(os.path.join(output_dir, "config.json"), "w") as f:
+            json.dump(final_cfg, f, indent=2)
+
+    # Weak scaling: fiecare rank păstrează train_samples; strong: se împart
+    train_samples = final_cfg["train_samples"]
+    if dist_cfg.get("scaling") == "weak":
+        train_samples *= world_size
 
     # 2. Load Data & Tokenizer
     print(f"[Train] Loading datasets for {task}...")
@@ -60,8 +87,10 @@ def run_training(final_cfg):
         task=task,
         model_name=model_name,
         dataset_cfg=final_cfg["dataset"],
-        train_samples=final_cfg["train_samples"],
-        eval_samples=final_cfg["eval_samples"]
+        train_samples=train_samples,
+        eval_samples=final_cfg["eval_samples"],
+        rank=rank,
+        world_size=world_size
     )
     
     num_labels = None
@@ -78,6 +107,8 @@ def run_training(final_cfg):
             if hasattr(label_feature, "names"):
                 id2label = {i: name for i, name in enumerate(label_feature.names)}
                 label2id = {name: i for i, name in enumerate(label_feature.names)}
+        elif hasattr(train_ds, "num_labels"):
+            num_labels = train_ds.num_labels
         print(f"[Train] Detected {num_labels} labels for classification.")
 
     # 3. Load Model
@@ -117,6 +148,7 @@ def run_training(final_cfg):
         lora_dropout=0.1
     )
     model = get_peft_model(model, peft_config)
+    broadcast_trainable_parameters(model)
     model.print_trainable_parameters()
 
     # 6. Data Collator
@@ -129,6 +161,27 @@ def run_training(final_cfg):
         data_collator = DataCollatorWithPadding(tokenizer)
 
     # 7. Training Arguments
+    # Multi-process: init_distributed() a scos RANK/LOCAL_RANK/WORLD_SIZE din env,
+    # deci TrainingArguments / accelerate văd un singur proces pe fiecare rank
+    # (fără DDP și fără DistributedSampler - datele sunt deja shard-uite).
+    # Gradientele se sincronizează în GradientAllReduceCallback, deci
+    # clipping-ul se face acolo, după all-reduce.
+    allreduce_callback = GradientAllReduceCallback(max_grad_norm=1.0 if world_size > 1 else 0.0)
+
+    # Benchmark mode: stop la buget de timp / tokeni sau când step time-ul s-a stabilizat
+    benchmark_cfg = training_cfg.get("benchmark_mode", {})
+    benchmark_callback = None
+    if benchmark_cfg.get("enabled"):
+        benchmark_callback = BenchmarkStopCallback(
+            benchmark_cfg,
+            samples_per_step=(
+                training_cfg["per_device_train_batch_size"]
+                * training_cfg["gradient_accumulation_steps"]
+                * world_size
+            ),
+            world_size=world_size
+        )
+
     args = TrainingArguments(
         output_dir=os.path.join(output_dir, "checkpoints"),
         overwrite_output_dir=True,
@@ -139,10 +192,14 @@ def run_training(final_cfg):
         logging_steps=training_cfg["logging_steps"],
         eval_steps=training_cfg["eval_steps"],
         save_steps=training_cfg["save_steps"],
+        save_strategy="steps" if main_process else "no",
+        max_grad_norm=0.0 if world_size > 1 else 1.0,
         fp16=training_cfg["fp16"],
         bf16=training_cfg["bf16"] and torch.cuda.is_bf16_supported(),
         report_to=training_cfg["report_to"],
-        disable_tqdm=False,
+        disable_tqdm=not main_process,
+        include_num_input_tokens_seen=benchmark_callback is not None,
+        train_sampling_strategy=train_sampling_strategy(train_ds),
         eval_strategy="no" if eval_ds is None else "steps"
     )
 
@@ -154,7 +211,11 @@ def run_training(final_cfg):
         eval_dataset=eval_ds,
         processing_class=tokenizer,
         data_collator=data_collator,
-        callbacks=[CustomMonitorCallback(output_dir)]
+        callbacks=(
+            ([CustomMonitorCallback(output_dir)] if main_process else [])
+            + [allreduce_callback]
+            + ([benchmark_callback] if benchmark_callback else [])
+        )
     )
 
     # 9. Start Training
@@ -163,26 +224,84 @@ def run_training(final_cfg):
     train_result = trainer.train()
     total_time = time.time() - start_time
     
-    print(f"[Train] Training complete in {total_time:.2f}s")
+    print(f"[Train] Rank {rank}: training complete in {total_time:.2f}s")
+
+    # Per-rank stats -> rank 0; timpul run-ului e dat de cel mai lent rank
+    rank_stats = gather_objects({**allreduce_callback.summary(), "training_time_sec": total_time})
+    total_time = max(s["training_time_sec"] for s in rank_stats)
+    train_loss = all_reduce_mean(train_result.training_loss)
 
-    # 10. Final Evaluation
+    # 10. Final Evaluation (inference_mode, LoRA merged, own batch size)
     eval_metrics = {}
-    if eval_ds:
+    if eval_ds is not None:
         print("[Train] Running final evaluation...")
-        eval_metrics = trainer.evaluate()
+        eval_cfg = dict(training_cfg.get("evaluation", {}))
+        if not eval_cfg.get("generation_max_new_tokens"):
+            eval_cfg["generation_max_new_tokens"] = final_cfg["dataset"].get("max_target_len")
+        # Lungimea logits-urilor: decoder-ul (target) la seq2seq, input-ul în rest
+        eval_cfg.setdefault("max_seq_len", (
+            final_cfg["dataset"].get("max_target_len") if task == "summarization" else None
+        ) or final_cfg["dataset"]["max_input_len"])
+        eval_metrics = run_evaluation(
+            model=trainer.model,
+            task=task,
+            eval_ds=eval_ds,
+            data_collator=data_collator,
+            tokenizer=tokenizer,
+            eval_cfg=eval_cfg,
+            # acumulatorii (sume, nll, tokeni, confusion) se adună peste rank-uri
+            gather_fn=gather_objects if world_size > 1 else None
+        )
 
-    # 11. Log Summary
-    monitor_record = monitor_run(
-        config=final_cfg,
-        train_loss=train_result.training_loss,
-        eval_loss=eval_metrics.get("eval_loss"),
+    # 10b. Deployment variants (CPU): LoRA merged / int8 / merged + int8
+    inference_variants = None
+    variants_cfg = training_cfg.get("inference_variants", {})
+    if eval_ds is not None and variants_cfg.get("enabled") and main_process:
+        print("[Train] Benchmarking inference variants...")
+        inference_variants = run_inference_variants(
+            model=trainer.model,
+            task=task,
+            eval_ds=eval_ds,
+            data_collator=data_collator,
+            tokenizer=tokenizer,
+            variants_cfg=variants_cfg,
+            generation_max_new_tokens=final_cfg["dataset"].get("max_target_len") or 128
+        )
+
+    benchmark_report = benchmark_callback.summary() if benchmark_callback else None
+    if benchmark_report:
+        print(f"[Train] Benchmark stop reason: {benchmark_report['stop_reason']}")
+
+    distributed_report = scaling_report(
+        rank_stats=rank_stats,
         training_time=total_time,
-        output_dir=output_dir
+        world_size=world_size,
+        scaling=dist_cfg.get("scaling", "strong"),
+        baseline_time=load_baseline_training_time(dist_cfg.get("baseline_run_dir")),
     )
 
+    # 11. Log Summary (doar rank 0 scrie)
+    monitor_record = None
+    if main_process:
+        monitor_record = monitor_run(
+            config=final_cfg,
+            train_loss=train_loss,
+            eval_loss=eval_metrics.get("eval_loss"),
+            training_time=total_time,
+            output_dir=output_dir,
+            extra_metrics={
+                "distributed": distributed_report,
+                "inference_variants": inference_variants,
+                "benchmark": benchmark_report
+            }
+        )
+
     return {
-        "train_loss": train_result.training_loss,
+        "train_loss": train_loss,
         "eval_metrics": eval_metrics,
         "monitor_record": monitor_record,
-        "output_dir": output_dir
+        "output_dir": output_dir,
+        "distributed": distributed_report,
+        "inference_variants": inference_variants,
+        "benchmark": benchmark_report
     }
\ No newline at end of file
@@ -0,0 +1,166 @@
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+import torch
+from torch import nn
+from transformers import Trainer, TrainerControl, TrainingArguments
+
+from helpers.step_callback import BenchmarkStopCallback
+from runner.build_config import _apply_block_override, merge_user_config
+
+
+def _callback(**cfg):
+    return BenchmarkStopCallback(
+        {"step_time_cv_threshold": None, "window_steps": 4, "warmup_steps": 0, **cfg},
+        samples_per_step=8,
+    )
+
+
+def _fill_window(callback, step_times, tokens=100):
+    for t in step_times:
+        callback._window.append((t, tokens))
+
+
+def test_check_stop_time_budget():
+    callback = _callback(time_budget_sec=10)
+    callback.elapsed = 9.9
+    assert callback._check_stop() == "completed"
+    callback.elapsed = 10.0
+    assert callback._check_stop() == "time_budget"
+
+
+def test_check_stop_token_budget():
+    callback = _callback(token_budget=1000)
+    callback.tokens_seen = 999
+    assert callback._check_stop() == "completed"
+    callback.tokens_seen = 1000
+    assert callback._check_stop() == "token_budget"
+
+
+def test_check_stop_converged_needs_full_window():
+    callback = _callback(step_time_cv_threshold=0.05)
+    _fill_window(callback, [1.0, 1.01, 0.99])
+    assert callback._step_time_cv() is None
+    assert callback._check_stop() == "completed"
+
+    _fill_window(callback, [1.0])
+    assert callback._check_stop() == "converged"
+
+
+def test_check_stop_not_converged_when_noisy():
+    callback = _callback(step_time_cv_threshold=0.05)
+    _fill_window(callback, [1.0, 2.0, 1.0, 2.0])
+    assert callback._step_time_cv() == pytest.approx(0.3849, rel=1e-3)
+    assert callback._check_stop() == "completed"
+
+
+def test_time_budget_wins_over_convergence():
+    callback = _callback(time_budget_sec=1, step_time_cv_threshold=0.05)
+    callback.elapsed = 2
+    _fill_window(callback, [1.0] * 4)
+    assert callback._check_stop() == "time_budget"
+
+
+def test_summary_steady_state_throughput():
+    callback = _callback()
+    _fill_window(callback, [0.5, 0.5, 1.0, 1.0], tokens=300)
+
+    summary = callback.summary()
+    assert summary["stop_reason"] == "completed"
+    assert summary["steady_state_window_steps"] == 4
+    assert summary["steady_state_step_time_sec"] == pytest.approx(0.75)
+    assert summary["steady_state_samples_per_sec"] == pytest.approx(8 / 0.75)
+    assert summary["steady_state_tokens_per_sec"] == pytest.approx(1200 / 3.0)
+
+
+def test_summary_empty_window():
+    summary = _callback().summary()
+    assert summary["steady_state_step_time_sec"] is None
+    assert summary["steady_state_tokens_per_sec"] is None
+
+
+def test_on_step_end_skips_warmup_and_sets_stop_flag():
+    callback = _callback(warmup_steps=2, token_budget=250)
+    callback.on_train_begin(None, None, None)
+    control = TrainerControl()
+
+    for step in range(1, 4):
+        state = SimpleNamespace(num_input_tokens_seen=100 * step, global_step=step)
+        callback.on_step_begin(None, state, control)
+        callback.on_step_end(None, state, control)
+
+    assert len(callback._window) == 1
+    assert callback.tokens_seen == 300
+    assert callback.stop_reason == "token_budget"
+    assert control.should_training_stop
+
+
+class _ToyLM(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.embed = nn.Embedding(16, 1)
+
+    def forward(self, input_ids, labels=None):
+        logits = self.embed(input_ids).mean(dim=(1, 2))
+        return {"loss": nn.functional.mse_loss(logits, labels), "logits": logits}
+
+
+class _ToyDataset(torch.utils.data.Dataset):
+    def __len__(self):
+        return 64
+
+    def __getitem__(self, idx):
+        return {"input_ids": torch.full((8,), idx % 16), "labels": torch.tensor(float(idx % 3))}
+
+
+def test_trainer_stops_on_token_budget():
+    callback = BenchmarkStopCallback({"token_budget": 5 * 2 * 8, "step_time_cv_threshold": None},
+                                     samples_per_step=2)
+    args = TrainingArguments(
+        output_dir=tempfile.mkdtemp(),
+        per_device_train_batch_size=2,
+        num_train_epochs=5,
+        save_strategy="no",
+        report_to="none",
+        use_cpu=True,
+        disable_tqdm=True,
+        include_num_input_tokens_seen=True,
+    )
+    trainer = Trainer(model=_ToyLM(), args=args, train_dataset=_ToyDataset(), callbacks=[callback])
+    trainer.train()
+
+    assert callback.stop_reason == "token_budget"
+    assert trainer.state.global_step == 5
+    assert callback.tokens_seen == 80
+
+
+def test_apply_block_override():
+    block = {"enabled": False, "time_budget_sec": None}
+    _apply_block_override(block, True)
+    assert block == {"enabled": True, "time_budget_sec": None}
+
+    _apply_block_override(block, {"time_budget_sec": 60})
+    assert block == {"enabled": True, "time_budget_sec": 60}
+
+    _apply_block_override(block, 0)
+    assert block["enabled"] is False
+
+
+def test_merge_user_config_benchmark_and_variant_overrides():
+    cfg = merge_user_config({
+        "task": "causal-lm",
+        "model": "gpt2",
+        "attention": "sdpa",
+        "benchmark_mode": {"enabled": True, "token_budget": 10000},
+        "inference_variants": True,
+    })
+    benchmark = cfg["training"]["benchmark_mode"]
+    assert benchmark["enabled"] is True
+    assert benchmark["token_budget"] == 10000
+    assert benchmark["window_steps"] == 20
+    assert cfg["training"]["inference_variants"]["enabled"] is True
+
+    defaults = merge_user_config({"task": "causal-lm", "model": "gpt2", "attention": "sdpa"})
+    assert defaults["training"]["benchmark_mode"]["enabled"] is False
+    assert defaults["training"]["inference_variants"]["enabled"] is False
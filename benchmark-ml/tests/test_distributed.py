@@ -0,0 +1,243 @@
+import os
+import socket
+import tempfile
+import time
+
+import datasets
+import pytest
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch import nn
+
+from helpers import data_loader
+from helpers.data_loader import load_task_datasets
+from helpers.distributed import (
+    GradientAllReduceCallback,
+    init_distributed,
+    scaling_report,
+)
+
+WORLD_SIZE = 2
+
+
+class ToyModel(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(4, 1)
+
+    def forward(self, x, labels=None):
+        logits = self.linear(x).squeeze(-1)
+        loss = nn.functional.mse_loss(logits, labels) if labels is not None else None
+        return {"loss": loss, "logits": logits}
+
+
+class ToyDataset(torch.utils.data.Dataset):
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, idx):
+        return {"x": self.x[idx], "labels": self.y[idx]}
+
+
+def _toy_data():
+    gen = torch.Generator().manual_seed(0)
+    return torch.randn(16, 4, generator=gen), torch.randn(16, generator=gen)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _init_env(rank: int, port: int):
+    os.environ.update(
+        MASTER_ADDR="127.0.0.1",
+        MASTER_PORT=str(port),
+        RANK=str(rank),
+        LOCAL_RANK=str(rank),
+        WORLD_SIZE=str(WORLD_SIZE),
+        LOCAL_WORLD_SIZE=str(WORLD_SIZE),
+    )
+
+
+def _worker(rank: int, port: int):
+    _init_env(rank, port)
+    info = init_distributed("gloo")
+    assert info == {"rank": rank, "world_size": WORLD_SIZE}
+    assert "WORLD_SIZE" not in os.environ
+
+    from transformers import Trainer, TrainingArguments
+
+    x, y = _toy_data()
+    shard = slice(rank, None, WORLD_SIZE)
+
+    # 1) Media gradientelor pe shard-uri egale == gradientul single-process pe tot batch-ul
+    torch.manual_seed(0)
+    model = ToyModel()
+    reference = ToyModel()
+    reference.load_state_dict(model.state_dict())
+
+    model(x[shard], y[shard])["loss"].backward()
+    GradientAllReduceCallback(max_grad_norm=0.0).on_pre_optimizer_step(None, None, None, model=model)
+
+    reference(x, y)["loss"].backward()
+    for p, ref in zip(model.parameters(), reference.parameters()):
+        torch.testing.assert_close(p.grad, ref.grad)
+
+    # 2) HF Trainer rămâne single-process pe fiecare rank (env-ul torchrun a fost scos)
+    args = TrainingArguments(
+        output_dir=tempfile.mkdtemp(),
+        per_device_train_batch_size=2,
+        num_train_epochs=2,
+        learning_rate=0.1,
+        max_grad_norm=0.0,
+        save_strategy="no",
+        report_to="none",
+        use_cpu=True,
+        disable_tqdm=True,
+    )
+    assert args.world_size == 1
+
+    torch.manual_seed(rank)  # init diferit per rank; sincronizat mai jos
+    model = ToyModel()
+    for p in model.parameters():
+        dist.broadcast(p.data, src=0)
+
+    callback = GradientAllReduceCallback(max_grad_norm=1.0)
+    trainer = Trainer(
+        model=model,
+        args=args,
+        train_dataset=ToyDataset(x[shard], y[shard]),
+        callbacks=[callback],
+    )
+    trainer.train()
+
+    assert len(callback.allreduce_times) == trainer.state.global_step > 0
+
+    # 3) După N step-uri parametrii sunt identici pe toate rank-urile
+    flat = torch.cat([p.detach().reshape(-1) for p in model.parameters()])
+    gathered = [torch.zeros_like(flat) for _ in range(WORLD_SIZE)]
+    dist.all_gather(gathered, flat)
+    for other in gathered[1:]:
+        assert torch.equal(gathered[0], other)
+
+    dist.destroy_process_group()
+
+
+def test_gloo_data_parallel_two_processes():
+    mp.spawn(_worker, args=(_free_port(),), nprocs=WORLD_SIZE, join=True)
+
+
+def _spawn(fn, *args, timeout: float = 120.0):
+    # join cu timeout: un rank blocat într-un colectiv trebuie să pice testul, nu să-l agațe
+    context = mp.spawn(fn, args=(_free_port(), *args), nprocs=WORLD_SIZE, join=False)
+    deadline = time.monotonic() + timeout
+    while not context.join(timeout=1.0):
+        if time.monotonic() > deadline:
+            for process in context.processes:
+                process.kill()
+            pytest.fail(f"Ranks did not finish within {timeout}s (collective deadlock?)")
+
+
+class _FakeTokenizer:
+    def __call__(self, texts, max_length, **kwargs):
+        return {"input_ids": [[1] * max_length for _ in texts],
+                "attention_mask": [[1] * max_length for _ in texts]}
+
+
+def _eval_split_worker(rank: int, port: int, splits: dict, eval_samples: int, expected):
+    _init_env(rank, port)
+    init_distributed("gloo")
+
+    # Hub-ul e înlocuit cu stream-uri locale (5 exemple pe "validation" -> impar)
+    def fake_load_dataset(name, config, split, streaming):
+        rows = [{"text": f"{split}-{i}"} for i in range(splits[split])]
+        return datasets.IterableDataset.from_generator(lambda: iter(rows))
+
+    datasets.load_dataset = fake_load_dataset
+    datasets.get_dataset_split_names = lambda name, config: list(splits)
+    data_loader.validate_dataset = lambda *args: None
+    data_loader.build_tokenizer = lambda model_name: _FakeTokenizer()
+
+    kwargs = dict(
+        task="causal-lm",
+        model_name="unused",
+        dataset_cfg={"dataset_name": "fake", "input_column": "text", "max_input_len": 4},
+        train_samples=4,
+        eval_samples=eval_samples,
+        rank=rank,
+        world_size=WORLD_SIZE,
+    )
+    if expected == "error":
+        # rank 0 primește 3 exemple, rank 1 doar 2 -> ambele rank-uri trebuie să pice
+        with pytest.raises(ValueError, match="Split 'validation' is too short"):
+            load_task_datasets(**kwargs)
+    else:
+        _, eval_ds, _ = load_task_datasets(**kwargs)
+        decisions = [None] * WORLD_SIZE
+        dist.all_gather_object(decisions, None if eval_ds is None else len(eval_ds))
+        assert decisions == [expected] * WORLD_SIZE
+
+    dist.destroy_process_group()
+
+
+@pytest.mark.parametrize("splits,eval_samples,expected", [
+    ({"train": 8, "validation": 5}, 6, "error"),
+    ({"train": 8, "validation": 5}, 4, 2),
+    ({"train": 8, "test": 5}, 4, 2),
+    ({"train": 8}, 4, None),
+])
+def test_eval_split_decision_is_identical_on_all_ranks(splits, eval_samples, expected):
+    _spawn(_eval_split_worker, splits, eval_samples, expected)
+
+
+def test_init_distributed_without_torchrun(monkeypatch):
+    monkeypatch.delenv("WORLD_SIZE", raising=False)
+    assert init_distributed() == {"rank": 0, "world_size": 1}
+
+
+@pytest.mark.parametrize("train_samples,eval_samples,split", [(1, 8, "train"), (8, 1, "eval")])
+def test_empty_shard_raises_before_loading(train_samples, eval_samples, split):
+    with pytest.raises(ValueError, match=f"Cannot shard .* '{split}' samples across 2 processes"):
+        load_task_datasets(
+            task="causal-lm",
+            model_name="unused",
+            dataset_cfg={"source": "synthetic", "max_input_len": 8},
+            train_samples=train_samples,
+            eval_samples=eval_samples,
+            rank=0,
+            world_size=2,
+        )
+
+
+def _stats(step_time, allreduce_time):
+    return {"mean_step_time_sec": step_time, "mean_allreduce_time_sec": allreduce_time}
+
+
+def test_scaling_report_strong():
+    report = scaling_report([_stats(1.0, 0.1), _stats(3.0, 0.3)], training_time=25.0,
+                            world_size=2, scaling="strong", baseline_time=40.0)
+    assert report["mean_step_time_sec"] == 2.0
+    assert report["max_step_time_sec"] == 3.0
+    assert report["mean_allreduce_time_sec"] == pytest.approx(0.2)
+    assert report["speedup"] == pytest.approx(1.6)
+    assert report["scaling_efficiency"] == pytest.approx(0.8)
+
+
+def test_scaling_report_weak():
+    report = scaling_report([_stats(1.0, 0.1)] * 4, training_time=50.0,
+                            world_size=4, scaling="weak", baseline_time=40.0)
+    assert report["scaling_efficiency"] == pytest.approx(0.8)
+    assert report["speedup"] == pytest.approx(3.2)
+
+
+def test_scaling_report_without_baseline():
+    report = scaling_report([_stats(None, None)], training_time=10.0, world_size=1, scaling="strong")
+    assert report["speedup"] is None
+    assert report["scaling_efficiency"] is None
+    assert report["mean_step_time_sec"] is None
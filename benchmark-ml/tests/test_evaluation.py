@@ -0,0 +1,199 @@
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+import torch
+from torch import nn
+
+from helpers.evaluation import (
+    RunningMean,
+    _TaskMetrics,
+    _lcs_length,
+    estimate_cpu_batch_size,
+    per_example_loss,
+    rouge_scores,
+    run_evaluation,
+)
+
+
+def test_lcs_length():
+    assert _lcs_length([], ["a"]) == 0
+    assert _lcs_length(list("abcbdab"), list("bdcaba")) == 4
+    assert _lcs_length(["x", "y"], ["x", "y"]) == 2
+
+
+def test_rouge_scores():
+    perfect = rouge_scores("The cat sat", "the cat sat")
+    assert perfect == {"rouge1": 1.0, "rouge2": 1.0, "rougeL": 1.0}
+
+    scores = rouge_scores("the cat sat on the mat", "the cat lay on the mat")
+    # 5/6 unigrame comune, 3/5 bigrame comune, LCS = 5
+    assert scores["rouge1"] == pytest.approx(5 / 6)
+    assert scores["rouge2"] == pytest.approx(3 / 5)
+    assert scores["rougeL"] == pytest.approx(5 / 6)
+
+    assert rouge_scores("", "the cat") == {"rouge1": 0.0, "rouge2": 0.0, "rougeL": 0.0}
+
+
+def test_running_mean_matches_batch_statistics():
+    values = [random.Random(0).gauss(3.0, 2.0) for _ in range(200)]
+    running = RunningMean()
+    running.update(values)
+
+    mean = sum(values) / len(values)
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+    assert running.mean == pytest.approx(mean)
+    assert running.ci_halfwidth() == pytest.approx(1.96 * std / math.sqrt(len(values)))
+
+
+def test_running_mean_merge_equals_single_pass():
+    values = [float(i % 7) for i in range(50)]
+    left, right, full = RunningMean(), RunningMean(), RunningMean()
+    left.update(values[:13])
+    right.update(values[13:])
+    full.update(values)
+
+    left.merge(right)
+    assert left.n == full.n
+    assert left.mean == pytest.approx(full.mean)
+    assert left.ci_halfwidth() == pytest.approx(full.ci_halfwidth())
+
+
+def test_ci_halfwidth_needs_two_samples():
+    running = RunningMean()
+    running.update([1.0])
+    assert running.ci_halfwidth() is None
+
+
+def test_per_example_loss_ignores_masked_tokens():
+    logits = torch.randn(2, 4, 10)
+    labels = torch.tensor([[1, 2, -100, -100], [3, 4, 5, 6]])
+    losses = per_example_loss("summarization", logits, labels)
+
+    expected_first = nn.functional.cross_entropy(logits[0, :2], labels[0, :2])
+    assert losses[0] == pytest.approx(expected_first.item(), rel=1e-5)
+
+    causal = per_example_loss("causal-lm", logits, labels)
+    expected_causal = nn.functional.cross_entropy(logits[1, :-1], labels[1, 1:])
+    assert causal[1] == pytest.approx(expected_causal.item(), rel=1e-5)
+
+
+def _classification_batches():
+    gen = torch.Generator().manual_seed(0)
+    logits = torch.randn(20, 3, generator=gen)
+    labels = torch.randint(0, 3, (20,), generator=gen)
+    return logits, labels
+
+
+def test_merged_state_dicts_match_single_accumulator():
+    logits, labels = _classification_batches()
+
+    full = _TaskMetrics("classification")
+    full.update_loss(per_example_loss("classification", logits, labels))
+    full.update_classification(logits, labels)
+
+    shards = []
+    for part in (slice(0, 7), slice(7, 20)):
+        metrics = _TaskMetrics("classification")
+        metrics.update_loss(per_example_loss("classification", logits[part], labels[part]))
+        metrics.update_classification(logits[part], labels[part])
+        shards.append(metrics.state_dict())
+
+    merged = _TaskMetrics.from_state_dicts("classification", shards)
+    assert merged.compute() == pytest.approx(full.compute())
+    assert merged.primary.ci_halfwidth() == pytest.approx(full.primary.ci_halfwidth())
+
+
+def test_perplexity_is_token_weighted_across_shards():
+    shards = []
+    for nll, tokens in ((10.0, 5), (30.0, 15)):
+        metrics = _TaskMetrics("causal-lm")
+        metrics.nll_sum, metrics.token_count = nll, tokens
+        shards.append(metrics.state_dict())
+
+    merged = _TaskMetrics.from_state_dicts("causal-lm", shards)
+    assert merged.compute()["eval_perplexity"] == pytest.approx(math.exp(40.0 / 20))
+
+
+def test_classification_f1_macro():
+    metrics = _TaskMetrics("classification")
+    logits = torch.tensor([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.0, 1.0]])
+    labels = torch.tensor([0, 1, 1, 1])
+    metrics.update_classification(logits, labels)
+
+    result = metrics.compute()
+    assert result["eval_accuracy"] == pytest.approx(0.75)
+    # label 0: tp=1 fp=1 fn=0 -> 2/3; label 1: tp=2 fp=0 fn=1 -> 4/5
+    assert result["eval_f1_macro"] == pytest.approx((2 / 3 + 4 / 5) / 2)
+
+
+def test_estimate_cpu_batch_size_is_bounded(monkeypatch):
+    model = SimpleNamespace(config=SimpleNamespace(hidden_size=896, vocab_size=151936))
+    monkeypatch.setattr("psutil.virtual_memory", lambda: SimpleNamespace(available=8 * 1024 ** 3))
+
+    batch = estimate_cpu_batch_size(model, "causal-lm", seq_len=256, max_batch_size=64)
+    assert 1 <= batch < 64
+    # logits-urile estimate încap în jumătate din memoria disponibilă
+    assert batch * 256 * 151936 * 4 * 3 <= 4 * 1024 ** 3
+
+    assert estimate_cpu_batch_size(model, "classification", seq_len=128, max_batch_size=64) == 64
+
+
+class _ToyClassifier(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.config = SimpleNamespace(num_labels=3, hidden_size=4)
+        self.embed = nn.Embedding(20, 3)
+
+    def forward(self, input_ids, attention_mask=None, **kwargs):
+        assert "labels" not in kwargs, "labels must not be passed to forward"
+        return SimpleNamespace(logits=self.embed(input_ids).mean(dim=1))
+
+
+def _collate(examples):
+    return {
+        "input_ids": torch.tensor([e["input_ids"] for e in examples]),
+        "labels": torch.tensor([e["labels"] for e in examples]),
+    }
+
+
+def _eval_ds(n=40):
+    rng = random.Random(0)
+    return [{"input_ids": [rng.randrange(20) for _ in range(5)], "labels": rng.randrange(3)} for _ in range(n)]
+
+
+def test_run_evaluation_classification():
+    result = run_evaluation(_ToyClassifier(), "classification", _eval_ds(), _collate, None,
+                            {"batch_size": 8})
+    assert result["eval_samples"] == 40
+    assert result["eval_stop_reason"] == "completed"
+    assert result["eval_batch_size"] == 8
+    assert {"eval_loss", "eval_accuracy", "eval_f1_macro"} <= result.keys()
+
+
+def test_run_evaluation_time_budget_stops_after_first_batch():
+    result = run_evaluation(_ToyClassifier(), "classification", _eval_ds(), _collate, None,
+                            {"batch_size": 8, "time_budget_sec": 0})
+    assert result["eval_samples"] == 8
+    assert result["eval_stop_reason"] == "time_budget"
+
+
+def test_run_evaluation_gather_fn_combines_ranks():
+    model = _ToyClassifier()
+    ds = _eval_ds()
+    single = run_evaluation(model, "classification", ds, _collate, None, {"batch_size": 4})
+
+    other_rank = {}
+
+    def capture(local):
+        other_rank.update(local)
+        return [local]
+
+    run_evaluation(model, "classification", ds[20:], _collate, None, {"batch_size": 4}, gather_fn=capture)
+    combined = run_evaluation(model, "classification", ds[:20], _collate, None, {"batch_size": 4},
+                              gather_fn=lambda local: [local, other_rank])
+
+    assert combined["eval_samples"] == 40
+    for key in ("eval_loss", "eval_accuracy", "eval_f1_macro", "eval_ci_halfwidth"):
+        assert combined[key] == pytest.approx(single[key])
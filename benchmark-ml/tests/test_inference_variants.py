@@ -0,0 +1,149 @@
+import pytest
+import torch
+from peft import LoraConfig, TaskType, get_peft_model
+from torch import nn
+from transformers import GPT2Config, GPT2LMHeadModel
+from transformers.pytorch_utils import Conv1D
+
+from helpers.inference_variants import (
+    VARIANTS,
+    _cycle,
+    benchmark_latency,
+    build_variant,
+    conv1d_to_linear,
+    run_inference_variants,
+)
+
+
+def _tiny_gpt2_lora():
+    torch.manual_seed(0)
+    config = GPT2Config(n_layer=2, n_embd=32, n_head=2, n_positions=32, vocab_size=64)
+    model = get_peft_model(
+        GPT2LMHeadModel(config),
+        LoraConfig(task_type=TaskType.CAUSAL_LM, r=4, lora_alpha=8, fan_in_fan_out=True),
+    )
+    # LoRA B e inițializat cu zero; îl facem nenul ca merge-ul să conteze
+    with torch.no_grad():
+        for name, param in model.named_parameters():
+            if "lora_B" in name:
+                param.normal_(std=0.02)
+    return model.eval()
+
+
+def _collate(examples):
+    input_ids = torch.tensor([e["input_ids"] for e in examples])
+    return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids), "labels": input_ids.clone()}
+
+
+def _eval_ds(n=12):
+    gen = torch.Generator().manual_seed(1)
+    return [{"input_ids": torch.randint(0, 64, (16,), generator=gen).tolist()} for _ in range(n)]
+
+
+def test_conv1d_to_linear_is_equivalent():
+    torch.manual_seed(0)
+    conv = Conv1D(8, 4)
+    wrapper = nn.Sequential(conv)
+    x = torch.randn(3, 4)
+    expected = conv(x)
+
+    assert conv1d_to_linear(wrapper) == 1
+    assert isinstance(wrapper[0], nn.Linear)
+    torch.testing.assert_close(wrapper(x), expected)
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_variants_stay_close_to_baseline(variant):
+    model = _tiny_gpt2_lora()
+    batch = _collate(_eval_ds(2))
+    inputs = {"input_ids": batch["input_ids"]}
+    baseline, _ = build_variant(model, "baseline")
+    expected = baseline(**inputs).logits
+
+    variant_model, info = build_variant(model, variant)
+    with torch.inference_mode():
+        logits = variant_model(**inputs).logits
+
+    atol = 0.1 if "int8" in variant else 1e-4
+    torch.testing.assert_close(logits, expected, atol=atol, rtol=0)
+
+    if "int8" in variant:
+        # GPT-2: c_attn / c_proj (attn) + c_fc / c_proj (mlp) pe fiecare layer, plus lm_head
+        assert info["converted_conv1d"] == 2 * 4
+        assert info["quantized_modules"] == 2 * 4 + 1
+        assert any("c_attn" in name for name in info["quantized_module_names"])
+        assert not any("lora_" in name for name in info["quantized_module_names"])
+    else:
+        assert info["quantized_modules"] == 0
+
+
+def test_build_variant_does_not_touch_trained_model():
+    model = _tiny_gpt2_lora()
+    before = {k: v.clone() for k, v in model.state_dict().items()}
+    build_variant(model, "merged_int8")
+    after = model.state_dict()
+    assert before.keys() == after.keys()
+    assert all(torch.equal(before[k], after[k]) for k in before)
+
+
+def test_unknown_variant():
+    with pytest.raises(ValueError, match="Unknown inference variant"):
+        build_variant(_tiny_gpt2_lora(), "fp8")
+
+
+def test_cycle_repeats_loader():
+    batches = list(zip(range(7), _cycle([1, 2, 3])))
+    assert [b for _, b in batches] == [1, 2, 3, 1, 2, 3, 1]
+    assert list(_cycle([])) == []
+
+
+def test_benchmark_latency_times_requested_batches_without_labels():
+    seen = []
+
+    class Recorder(nn.Module):
+        def forward(self, **kwargs):
+            seen.append(set(kwargs))
+
+    loader = torch.utils.data.DataLoader(_eval_ds(6), batch_size=4, collate_fn=_collate)
+    stats = benchmark_latency(Recorder(), loader, num_batches=5, warmup_batches=2, task="causal-lm")
+
+    assert stats["timed_batches"] == 5
+    assert stats["latency_mode"] == "forward"
+    assert len(seen) == 7
+    assert all("labels" not in keys for keys in seen)
+
+
+def test_run_inference_variants_records_all_variants():
+    result = run_inference_variants(
+        model=_tiny_gpt2_lora(),
+        task="causal-lm",
+        eval_ds=_eval_ds(),
+        data_collator=_collate,
+        tokenizer=None,
+        variants_cfg={"batch_size": 4, "num_batches": 5, "warmup_batches": 1, "eval_samples": 8},
+    )
+
+    assert set(result["variants"]) == set(VARIANTS)
+    baseline = result["variants"]["baseline"]
+    assert baseline["drift"]["eval_loss"] == 0.0
+    for record in result["variants"].values():
+        assert record["timed_batches"] == 5
+        assert "eval_perplexity" in record["metrics"]
+    assert result["variants"]["int8"]["model_size_MB"] < baseline["model_size_MB"]
+
+
+def test_summarization_latency_times_generate():
+    from transformers import T5Config, T5ForConditionalGeneration
+
+    torch.manual_seed(0)
+    config = T5Config(vocab_size=64, d_model=16, d_kv=8, d_ff=32, num_layers=1, num_heads=2,
+                      decoder_start_token_id=0, pad_token_id=0, eos_token_id=1)
+    model = T5ForConditionalGeneration(config).eval()
+
+    loader = torch.utils.data.DataLoader(_eval_ds(4), batch_size=2, collate_fn=_collate)
+    stats = benchmark_latency(model, loader, num_batches=2, warmup_batches=0,
+                              task="summarization", generation_max_new_tokens=5)
+
+    assert stats["latency_mode"] == "generate"
+    assert stats["timed_batches"] == 2
+    assert stats["throughput_tokens_per_sec"] > 0
@@ -0,0 +1,165 @@
+import random
+import tempfile
+
+import pytest
+import torch
+from torch import nn
+from torch.utils.data import SequentialSampler
+
+from helpers.synthetic import SyntheticTaskDataset, sample_length, train_sampling_strategy
+
+
+SYNTHETIC_CFG = {
+    "seed": 7,
+    "vocab_offset": 0,
+    "num_labels": 4,
+    "input_length": {"type": "uniform", "min": 4, "max": 32},
+    "target_length": {"type": "fixed", "length": 8},
+}
+
+
+@pytest.mark.parametrize("dist_cfg", [
+    {"type": "fixed", "length": 16},
+    {"type": "uniform", "min": 1, "max": 64},
+    {"type": "lognormal", "median": 32, "sigma": 1.5},
+    {"type": "bimodal", "short": 4, "long": 60, "std": 20, "p_long": 0.5},
+])
+def test_sample_length_stays_in_bounds(dist_cfg):
+    rng = random.Random(0)
+    lengths = [sample_length(rng, dist_cfg, max_len=64) for _ in range(500)]
+    assert all(1 <= n <= 64 for n in lengths)
+
+
+def test_sample_length_fixed_defaults_to_max_len():
+    assert sample_length(random.Random(0), {"type": "fixed"}, max_len=1024) == 1024
+
+
+def test_sample_length_relative_scales_with_max_len():
+    dist_cfg = {"type": "fixed", "relative": True, "length": 0.25}
+    assert sample_length(random.Random(0), dist_cfg, max_len=256) == 64
+    assert sample_length(random.Random(0), dist_cfg, max_len=1024) == 256
+
+
+def test_sample_length_bimodal_produces_both_modes():
+    rng = random.Random(0)
+    dist_cfg = {"type": "bimodal", "short": 10, "long": 100, "std": 0, "p_long": 0.5}
+    assert {sample_length(rng, dist_cfg, max_len=128) for _ in range(200)} == {10, 100}
+
+
+def test_sample_length_unknown_distribution():
+    with pytest.raises(ValueError, match="Unknown length distribution"):
+        sample_length(random.Random(0), {"type": "zipf"}, max_len=64)
+
+
+def _dataset(**kwargs):
+    params = dict(
+        task="summarization",
+        num_samples=100,
+        synthetic_cfg=SYNTHETIC_CFG,
+        max_input_len=32,
+        max_target_len=16,
+        vocab_size=50,
+    )
+    params.update(kwargs)
+    return SyntheticTaskDataset(**params)
+
+
+def test_examples_are_deterministic_per_seed():
+    a, b = _dataset(), _dataset()
+    assert [a[i] for i in range(10)] == [b[i] for i in range(10)]
+
+    other_seed = _dataset(synthetic_cfg={**SYNTHETIC_CFG, "seed": 8})
+    assert [a[i] for i in range(10)] != [other_seed[i] for i in range(10)]
+
+
+def test_splits_differ():
+    train, validation = _dataset(split="train"), _dataset(split="validation")
+    assert train[0] != validation[0]
+
+
+def test_large_sample_counts_are_lazy():
+    ds = _dataset(num_samples=10 ** 12)
+    assert len(ds) == 10 ** 12
+    assert ds[10 ** 12 - 1] == ds[-1]
+    with pytest.raises(IndexError):
+        ds[10 ** 12]
+
+
+class _ToyClassifier(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(1, 4)
+
+    def forward(self, input_ids, attention_mask=None, labels=None):
+        logits = self.linear(input_ids.float().mean(dim=-1, keepdim=True))
+        return {"loss": nn.functional.cross_entropy(logits, labels), "logits": logits}
+
+
+def test_trainer_dataloader_is_lazy_for_huge_counts():
+    from transformers import Trainer, TrainingArguments, default_data_collator
+
+    # RandomSampler ar aloca randperm(10**12) înainte de primul batch
+    ds = _dataset(
+        task="classification",
+        num_samples=10 ** 12,
+        synthetic_cfg={**SYNTHETIC_CFG, "input_length": {"type": "fixed", "length": 8}},
+    )
+    args = TrainingArguments(
+        output_dir=tempfile.mkdtemp(),
+        per_device_train_batch_size=4,
+        report_to="none",
+        use_cpu=True,
+        train_sampling_strategy=train_sampling_strategy(ds),
+    )
+    trainer = Trainer(model=_ToyClassifier(), args=args, train_dataset=ds,
+                      data_collator=default_data_collator)
+
+    loader = trainer.get_train_dataloader()
+    assert isinstance(loader.batch_sampler.sampler, SequentialSampler)
+    batch = next(iter(loader))
+    assert batch["input_ids"].shape == (4, 8)
+    assert torch.equal(batch["labels"], torch.tensor([ds[i]["labels"] for i in range(4)]))
+
+
+def test_train_sampling_strategy_is_random_for_other_datasets():
+    assert train_sampling_strategy([{"input_ids": [1]}]) == "random"
+
+
+def test_shards_partition_the_global_examples():
+    full = _dataset(num_samples=10)
+    shards = [_dataset(num_samples=10, num_shards=3, shard_index=r) for r in range(3)]
+
+    assert [len(s) for s in shards] == [3, 3, 3]
+    for rank, shard in enumerate(shards):
+        for i in range(len(shard)):
+            assert shard[i] == full[rank + i * 3]
+
+
+def test_special_ids_are_never_sampled():
+    special = {0, 1, 2, 100, 101, 102, 103}
+    ds = _dataset(vocab_size=110, special_ids=special, synthetic_cfg={**SYNTHETIC_CFG, "vocab_offset": 0})
+    for i in range(50):
+        example = ds[i]
+        assert special.isdisjoint(example["input_ids"])
+        assert special.isdisjoint(example["labels"])
+
+
+@pytest.mark.parametrize("task,label_type", [
+    ("summarization", list),
+    ("classification", int),
+    ("causal-lm", None),
+])
+def test_task_example_layout(task, label_type):
+    example = _dataset(task=task)[0]
+    assert len(example["input_ids"]) == len(example["attention_mask"])
+    if label_type is None:
+        assert "labels" not in example
+    else:
+        assert isinstance(example["labels"], label_type)
+    if task == "classification":
+        assert 0 <= example["labels"] < SYNTHETIC_CFG["num_labels"]
+
+
+def test_vocab_must_exceed_offset():
+    with pytest.raises(ValueError, match="vocab_size"):
+        _dataset(vocab_size=10, synthetic_cfg={**SYNTHETIC_CFG, "vocab_offset": 100})